@@ -0,0 +1,99 @@
+"""partition schedule_classes by month
+
+Revision ID: 28d30a06699e
+Revises: 7e08278b7a21
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '28d30a06699e'
+down_revision: Union[str, None] = '7e08278b7a21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = (
+    "id, university_group_id, subject_id, date, day_of_week, time_start, time_end, "
+    "subject_name, subject_brief, class_type, auditory, lector"
+)
+
+COLUMNS_DDL = """
+    id INTEGER NOT NULL DEFAULT nextval('schedule_classes_id_seq'),
+    university_group_id INTEGER NOT NULL REFERENCES university_groups (id) ON DELETE CASCADE,
+    subject_id INTEGER REFERENCES subjects (id) ON DELETE SET NULL,
+    date DATE NOT NULL,
+    day_of_week VARCHAR NOT NULL,
+    time_start TIME WITHOUT TIME ZONE NOT NULL,
+    time_end TIME WITHOUT TIME ZONE NOT NULL,
+    subject_name VARCHAR NOT NULL,
+    subject_brief VARCHAR,
+    class_type VARCHAR,
+    auditory VARCHAR,
+    lector VARCHAR
+"""
+
+
+def rename_old_table() -> None:
+    op.execute("ALTER TABLE schedule_classes RENAME TO schedule_classes_old")
+    op.execute("ALTER TABLE schedule_classes_old RENAME CONSTRAINT schedule_classes_pkey TO schedule_classes_old_pkey")
+    op.execute("ALTER INDEX ix_uni_group_date RENAME TO ix_uni_group_date_old")
+    op.execute("ALTER INDEX ix_subject_id RENAME TO ix_subject_id_old")
+
+
+def move_rows_and_drop_old_table() -> None:
+    op.execute("ALTER SEQUENCE schedule_classes_id_seq OWNED BY schedule_classes.id")
+    op.create_index('ix_uni_group_date', 'schedule_classes', ['university_group_id', 'date'], unique=False)
+    op.create_index('ix_subject_id', 'schedule_classes', ['subject_id'], unique=False)
+    op.execute(f"INSERT INTO schedule_classes ({COLUMNS}) SELECT {COLUMNS} FROM schedule_classes_old")
+    op.execute("DROP TABLE schedule_classes_old")
+
+
+def upgrade() -> None:
+    rename_old_table()
+    op.execute(f"""
+        CREATE TABLE schedule_classes (
+            {COLUMNS_DDL},
+            PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    # Місячні партиції від найстарішої пари до поточного місяця + 2 наперед
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start date := date_trunc('month', LEAST(
+                COALESCE((SELECT min(date) FROM schedule_classes_old), current_date), current_date
+            ))::date;
+            last_month date := date_trunc('month', GREATEST(
+                COALESCE((SELECT max(date) FROM schedule_classes_old), current_date),
+                current_date + interval '2 months'
+            ))::date;
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF schedule_classes FOR VALUES FROM (%L) TO (%L)',
+                    'schedule_classes_y' || to_char(month_start, 'YYYY"m"MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+    move_rows_and_drop_old_table()
+
+
+def downgrade() -> None:
+    rename_old_table()
+    op.execute(f"""
+        CREATE TABLE schedule_classes (
+            {COLUMNS_DDL},
+            PRIMARY KEY (id)
+        )
+    """)
+    move_rows_and_drop_old_table()
@@ -0,0 +1,26 @@
+"""university_group_last_synced_at
+
+Revision ID: a7d3e9f04b18
+Revises: f5c2d8e19a63
+Create Date: 2026-10-19 21:03:52.117630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e9f04b18'
+down_revision: Union[str, None] = 'f5c2d8e19a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('university_groups', sa.Column('last_synced_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('university_groups', 'last_synced_at')
@@ -0,0 +1,42 @@
+"""schedule_classes starts_at/ends_at
+
+Revision ID: b3f1c9d27e40
+Revises: 28d30a06699e
+Create Date: 2026-10-19 12:40:05.772913
+
+"""
+from typing import Sequence, Union
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c9d27e40'
+down_revision: Union[str, None] = '28d30a06699e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMEZONE = os.getenv("TIMEZONE", "Europe/Kyiv")
+
+
+def upgrade() -> None:
+    op.add_column('schedule_classes', sa.Column('starts_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('schedule_classes', sa.Column('ends_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        sa.text(
+            "UPDATE schedule_classes SET "
+            "starts_at = (date + time_start) AT TIME ZONE :tz, "
+            "ends_at = (date + time_end) AT TIME ZONE :tz"
+        ).bindparams(tz=TIMEZONE)
+    )
+    op.alter_column('schedule_classes', 'starts_at', nullable=False)
+    op.alter_column('schedule_classes', 'ends_at', nullable=False)
+    op.create_index('ix_schedule_starts_at', 'schedule_classes', ['starts_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_schedule_starts_at', table_name='schedule_classes')
+    op.drop_column('schedule_classes', 'ends_at')
+    op.drop_column('schedule_classes', 'starts_at')
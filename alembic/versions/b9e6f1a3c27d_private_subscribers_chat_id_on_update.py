@@ -0,0 +1,34 @@
+"""private_subscribers_chat_id_on_update
+
+Revision ID: b9e6f1a3c27d
+Revises: a7d3e9f04b18
+Create Date: 2026-10-19 23:41:08.530214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9e6f1a3c27d'
+down_revision: Union[str, None] = 'a7d3e9f04b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Міграція групи в супергрупу змінює chat_id: підписники мають переїхати разом із чатом
+    op.drop_constraint('private_subscribers_chat_id_fkey', 'private_subscribers', type_='foreignkey')
+    op.create_foreign_key(
+        'private_subscribers_chat_id_fkey', 'private_subscribers', 'telegram_chats',
+        ['chat_id'], ['chat_id'], ondelete='CASCADE', onupdate='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('private_subscribers_chat_id_fkey', 'private_subscribers', type_='foreignkey')
+    op.create_foreign_key(
+        'private_subscribers_chat_id_fkey', 'private_subscribers', 'telegram_chats',
+        ['chat_id'], ['chat_id'], ondelete='CASCADE'
+    )
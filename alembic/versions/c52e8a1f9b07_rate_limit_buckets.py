@@ -0,0 +1,35 @@
+"""rate_limit_buckets
+
+Revision ID: c52e8a1f9b07
+Revises: b3f1c9d27e40
+Create Date: 2026-10-19 14:02:51.905317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52e8a1f9b07'
+down_revision: Union[str, None] = 'b3f1c9d27e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key'),
+    prefixes=['UNLOGGED']
+    )
+    op.create_index('ix_rate_limit_updated_at', 'rate_limit_buckets', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_rate_limit_updated_at', table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
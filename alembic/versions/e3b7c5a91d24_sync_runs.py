@@ -0,0 +1,46 @@
+"""sync_runs
+
+Revision ID: e3b7c5a91d24
+Revises: d8a4f2b61c3e
+Create Date: 2026-10-19 18:41:06.213754
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c5a91d24'
+down_revision: Union[str, None] = 'd8a4f2b61c3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_runs',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('university_group_id', sa.Integer(), nullable=False),
+    sa.Column('trigger', sa.String(), nullable=False),
+    sa.Column('attempt', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('cist_ms', sa.Float(), nullable=False),
+    sa.Column('cist_requests', sa.Integer(), nullable=False),
+    sa.Column('payload_bytes', sa.Integer(), nullable=False),
+    sa.Column('rows_inserted', sa.Integer(), nullable=False),
+    sa.Column('rows_updated', sa.Integer(), nullable=False),
+    sa.Column('rows_deleted', sa.Integer(), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['university_group_id'], ['university_groups.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_runs_group_started', 'sync_runs', ['university_group_id', 'started_at'], unique=False)
+    op.create_index('ix_sync_runs_started_at', 'sync_runs', ['started_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_runs_started_at', table_name='sync_runs')
+    op.drop_index('ix_sync_runs_group_started', table_name='sync_runs')
+    op.drop_table('sync_runs')
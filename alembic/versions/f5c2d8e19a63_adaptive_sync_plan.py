@@ -0,0 +1,32 @@
+"""adaptive_sync_plan
+
+Revision ID: f5c2d8e19a63
+Revises: e3b7c5a91d24
+Create Date: 2026-10-19 20:12:37.584102
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c2d8e19a63'
+down_revision: Union[str, None] = 'e3b7c5a91d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('university_groups', sa.Column('next_sync_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('university_groups', sa.Column('sync_interval', sa.Integer(), nullable=True))
+    op.add_column('university_groups', sa.Column('sync_failures', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_university_groups_next_sync_at', 'university_groups', ['next_sync_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_university_groups_next_sync_at', table_name='university_groups')
+    op.drop_column('university_groups', 'sync_failures')
+    op.drop_column('university_groups', 'sync_interval')
+    op.drop_column('university_groups', 'next_sync_at')
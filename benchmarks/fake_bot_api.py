@@ -0,0 +1,193 @@
+"""
+Локальна заглушка Telegram Bot API (aiohttp) для навантажувальних тестів усього процесу бота.
+
+Бот підключається до неї через TELEGRAM_API_URL, отримує апдейти з getUpdates (їх кладе
+генератор навантаження, див. benchmarks/load_test.py) і відповідає sendMessage/editMessageText/...
+Сервер додає затримку, з імовірністю error_rate повертає 429 з retry_after і збирає статистику:
+час від видачі апдейта до першої відповіді бота в той самий чат, кількість 429 і запити,
+надіслані в чат раніше, ніж минув його retry_after.
+"""
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Schedule bot", "username": "schedule_bench_bot"}
+REPLY_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup", "deleteMessage", "answerCallbackQuery"}
+LIMITED_METHODS = {"sendMessage", "editMessageText", "editMessageReplyMarkup"}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, retry_after: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+
+        self.updates: Deque[Dict[str, Any]] = deque()
+        self.new_updates = asyncio.Event()
+        self.next_update_id = 1
+        self.next_message_id = 1
+
+        # chat_id -> апдейти, що чекають на відповідь: (update_id, час видачі боту)
+        self.pending: Dict[int, Deque[Tuple[int, float]]] = defaultdict(deque)
+        self.callback_chats: Dict[str, int] = {}
+        self.delivered_at: Dict[int, float] = {}
+        self.reply_waiters: Dict[int, asyncio.Future] = {}
+
+        self.latencies: List[float] = []
+        self.methods: Counter = Counter()
+        self.delivered = 0
+        self.injected_429 = 0
+        self.retry_after_violations = 0
+        self.blocked_until: Dict[int, float] = {}
+
+    # --- апдейти від генератора ---
+
+    def push_update(self, update: Dict[str, Any]) -> int:
+        update_id = self.next_update_id
+        self.next_update_id += 1
+        update["update_id"] = update_id
+        if "callback_query" in update:
+            query = update["callback_query"]
+            self.callback_chats[query["id"]] = query["message"]["chat"]["id"]
+        self.updates.append(update)
+        self.new_updates.set()
+        return update_id
+
+    def wait_reply(self, update_id: int) -> asyncio.Future:
+        """Future з параметрами першої відповіді бота на апдейт (для сценаріїв із FSM)"""
+        future = asyncio.get_running_loop().create_future()
+        self.reply_waiters[update_id] = future
+        return future
+
+    def new_message_id(self) -> int:
+        message_id = self.next_message_id
+        self.next_message_id += 1
+        return message_id
+
+    # --- Bot API ---
+
+    async def get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset", 0) or 0)
+        limit = int(params.get("limit", 100) or 100)
+        timeout = float(params.get("timeout", 0) or 0)
+
+        while self.updates and self.updates[0]["update_id"] < offset:
+            self.updates.popleft()
+        if not self.updates and timeout:
+            self.new_updates.clear()
+            try:
+                await asyncio.wait_for(self.new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        batch = [self.updates[i] for i in range(min(limit, len(self.updates)))]
+        now = time.perf_counter()
+        for update in batch:
+            update_id = update["update_id"]
+            if update_id in self.delivered_at:
+                continue
+            self.delivered_at[update_id] = now
+            self.delivered += 1
+            event = update.get("message") or update.get("callback_query", {}).get("message")
+            if event:
+                self.pending[event["chat"]["id"]].append((update_id, now))
+        return batch
+
+    def record_reply(self, chat_id: Optional[int], params: Dict[str, Any]):
+        queue = self.pending.get(chat_id)
+        if not queue:
+            return
+        update_id, delivered_at = queue.popleft()
+        self.latencies.append(time.perf_counter() - delivered_at)
+        waiter = self.reply_waiters.pop(update_id, None)
+        if waiter and not waiter.done():
+            waiter.set_result(params)
+
+    def message(self, chat_id: int, text: Optional[str], message_id: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "message_id": message_id or self.new_message_id(),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER,
+            "text": text or "",
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        api_method = request.match_info["method"]
+        params = dict(await request.post()) if request.method == "POST" else dict(request.query)
+        self.methods[api_method] += 1
+
+        if api_method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self.get_updates(params)})
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(self.latency + random.uniform(-self.jitter, self.jitter), 0))
+
+        chat_id = int(params["chat_id"]) if params.get("chat_id") else None
+        if api_method == "answerCallbackQuery":
+            chat_id = self.callback_chats.pop(params.get("callback_query_id"), None)
+
+        if api_method in LIMITED_METHODS and chat_id is not None:
+            now = time.monotonic()
+            if self.blocked_until.get(chat_id, 0) > now:
+                self.retry_after_violations += 1
+            if random.random() < self.error_rate:
+                self.injected_429 += 1
+                self.blocked_until[chat_id] = now + self.retry_after
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                })
+
+        if api_method in REPLY_METHODS:
+            self.record_reply(chat_id, params)
+
+        if api_method == "getMe":
+            result: Any = BOT_USER
+        elif api_method in ("sendMessage", "editMessageText", "editMessageReplyMarkup"):
+            message_id = int(params["message_id"]) if params.get("message_id") else None
+            result = self.message(chat_id, params.get("text"), message_id)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        return app
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        runner = web.AppRunner(self.build_app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        unanswered = sum(len(queue) for queue in self.pending.values())
+        return {
+            "elapsed_s": elapsed,
+            "updates_delivered": self.delivered,
+            "updates_per_s": self.delivered / elapsed if elapsed else 0.0,
+            "replies": len(self.latencies),
+            "unanswered": unanswered,
+            "latency_p50_ms": percentile(self.latencies, 0.50) * 1000,
+            "latency_p95_ms": percentile(self.latencies, 0.95) * 1000,
+            "latency_p99_ms": percentile(self.latencies, 0.99) * 1000,
+            "injected_429": self.injected_429,
+            "retry_after_violations": self.retry_after_violations,
+            "methods": dict(self.methods),
+        }
@@ -0,0 +1,70 @@
+"""
+Локальна заглушка CIST API (aiohttp) з детермінованими даними для бенчмарків.
+
+Група з cist id N має subjects предметів «Предмет 1..subjects» і classes_per_day пар
+щодня на проміжку startedAt..endedAt, тож синхронізація не видаляє предмети, засіяні бенчмарком.
+"""
+from datetime import datetime, timedelta, time as dt_time
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+PAIR_STARTS = [dt_time(8, 0), dt_time(9, 50), dt_time(11, 40), dt_time(13, 30), dt_time(15, 20), dt_time(17, 10)]
+PAIR_LENGTH = timedelta(minutes=95)
+CLASS_TYPES = ["Лк", "Пз", "Лб"]
+KYIV_TZ = ZoneInfo("Europe/Kyiv")
+
+
+def subject_name(number: int) -> str:
+    return f"Предмет {number}"
+
+
+def subject_brief(number: int) -> str:
+    return f"П{number}"
+
+
+def build_app(subjects: int = 8, classes_per_day: int = 4) -> web.Application:
+    async def groups(request: web.Request) -> web.Response:
+        return web.json_response({"success": "true", "data": []})
+
+    async def group_subjects(request: web.Request) -> web.Response:
+        return web.json_response({"success": "true", "data": [
+            {"id": k, "brief": subject_brief(k), "name": subject_name(k)} for k in range(1, subjects + 1)
+        ]})
+
+    async def group_schedule(request: web.Request) -> web.Response:
+        group_id = int(request.match_info["group_id"])
+        started = datetime.fromtimestamp(int(request.query["startedAt"]), KYIV_TZ).date()
+        ended = datetime.fromtimestamp(int(request.query["endedAt"]), KYIV_TZ).date()
+
+        events = []
+        day = started
+        while day <= ended:
+            for pair in range(min(classes_per_day, len(PAIR_STARTS))):
+                number = (group_id + day.toordinal() + pair) % subjects + 1
+                start = datetime.combine(day, PAIR_STARTS[pair], KYIV_TZ)
+                events.append({
+                    "subject": {"title": subject_name(number), "brief": subject_brief(number)},
+                    "type": CLASS_TYPES[pair % len(CLASS_TYPES)],
+                    "teachers": [{"fullName": f"Викладач {number}"}],
+                    "groups": [{"name": f"ГРУПА-{group_id}"}],
+                    "auditorium": {"name": str(100 + pair)},
+                    "numberPair": pair + 1,
+                    "startedAt": int(start.timestamp()),
+                    "endedAt": int((start + PAIR_LENGTH).timestamp()),
+                })
+            day += timedelta(days=1)
+        return web.json_response({"success": True, "data": events})
+
+    app = web.Application()
+    app.router.add_get("/groups", groups)
+    app.router.add_get("/groups/{group_id}/subjects", group_subjects)
+    app.router.add_get("/groups/{group_id}/schedule", group_schedule)
+    return app
+
+
+async def start_fake_cist(host: str, port: int, subjects: int = 8, classes_per_day: int = 4) -> web.AppRunner:
+    runner = web.AppRunner(build_app(subjects, classes_per_day), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
@@ -0,0 +1,69 @@
+"""
+Сесія aiogram без мережі: запити до Bot API не відправляються, а записуються.
+Bot з такою сесією проходить увесь шлях aiogram (методи, middleware сесії),
+тому підходить для бенчмарків розсилок і прогону апдейтів через Dispatcher.
+"""
+import asyncio
+from collections import Counter
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, Message, User
+
+FAKE_TOKEN = "123456:FAKE-TOKEN-FOR-BENCHMARKS"
+BOT_USER = User(id=123456, is_bot=True, first_name="Schedule bot", username="schedule_bench_bot")
+
+
+class FakeSession(BaseSession):
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: List[Tuple[str, Optional[int]]] = []
+        self.next_message_id = 1
+
+    @property
+    def methods(self) -> Counter:
+        return Counter(name for name, _ in self.calls)
+
+    def reset(self):
+        self.calls.clear()
+
+    def fake_message(self, chat_id: int, text: Optional[str], message_id: Optional[int] = None) -> Message:
+        if message_id is None:
+            message_id = self.next_message_id
+            self.next_message_id += 1
+        return Message(
+            message_id=message_id,
+            date=datetime.now(),
+            chat=Chat(id=chat_id, type="private" if chat_id > 0 else "supergroup"),
+            from_user=BOT_USER,
+            text=text,
+        )
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType], timeout: Optional[int] = None) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        api_method = method.__api_method__
+        chat_id = getattr(method, "chat_id", None)
+        self.calls.append((api_method, chat_id))
+
+        if api_method == "getMe":
+            return BOT_USER
+        if api_method in ("sendMessage", "editMessageText"):
+            return self.fake_message(int(chat_id or 0), method.text, getattr(method, "message_id", None))
+        return True
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30, chunk_size: int = 65536,
+                             raise_for_status: bool = True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def make_fake_bot(latency: float = 0.0) -> Bot:
+    return Bot(token=FAKE_TOKEN, session=FakeSession(latency))
@@ -0,0 +1,176 @@
+"""
+Навантажувальний тест процесу бота через локальну заглушку Bot API (benchmarks/fake_bot_api.py).
+
+Генерує команди в групових чатах (/schedule_today, /schedule_week, /info) з постійною частотою
+і сценарії майстра /setting_links у приватних чатах (кожен наступний крок — після відповіді бота):
+редагування посилання до кінця — вибір типів, список посилань, вибір посилання, нова назва, збереження.
+В кінці друкує пропускну здатність, p50/p95/p99 часу відповіді, 429 і порушення retry_after.
+
+Чати й користувачі відповідають засіву benchmarks/scale.py (чат -c, адміністратор c),
+--seed засіює BENCH_DATABASE_URL перед стартом (база перестворюється).
+
+Запуск (два процеси):
+    BENCH_DATABASE_URL=... python -m benchmarks.load_test --seed --groups 200 --chats 1000 --rate 100
+    DATABASE_URL=<та сама база> TELEGRAM_API_URL=http://127.0.0.1:8081 BOT_TOKEN=123456:LOAD python main.py
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from argparse import Namespace
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fake_bot_api import FakeBotAPI
+
+COMMAND_MIX = [("/schedule_today", 5), ("/schedule_week", 3), ("/info", 2)]
+WIZARD_TYPES = ["Лк", "Пз"]
+
+
+def user(user_id: int) -> Dict[str, Any]:
+    return {"id": user_id, "is_bot": False, "first_name": f"Користувач {user_id}"}
+
+
+def message_update(api: FakeBotAPI, chat: Dict[str, Any], user_id: int, text: str) -> Dict[str, Any]:
+    return {"message": {
+        "message_id": api.new_message_id(),
+        "date": int(time.time()),
+        "chat": chat,
+        "from": user(user_id),
+        "text": text,
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if text.startswith("/") else [],
+    }}
+
+
+def callback_update(api: FakeBotAPI, user_id: int, data: str) -> Dict[str, Any]:
+    return {"callback_query": {
+        "id": f"{user_id}-{api.next_update_id}",
+        "from": user(user_id),
+        "chat_instance": str(user_id),
+        "data": data,
+        "message": api.message(user_id, "…"),
+    }}
+
+
+async def group_traffic(api: FakeBotAPI, args, deadline: float):
+    """Відкрите навантаження: args.rate команд на секунду незалежно від швидкості відповідей"""
+    commands, weights = zip(*COMMAND_MIX)
+    interval = 1 / args.rate
+    next_at = time.perf_counter()
+    while next_at < deadline:
+        c = random.randint(1, args.chats)
+        chat = {"id": -c, "type": "supergroup", "title": f"Чат {c}"}
+        user_id = c if random.random() < 0.5 else 1_000_000 + c * max(args.subscribers, 1)
+        api.push_update(message_update(api, chat, user_id, random.choices(commands, weights)[0]))
+        next_at += interval
+        await asyncio.sleep(max(next_at - time.perf_counter(), 0))
+
+
+def link_ids(reply: Optional[Dict[str, Any]]) -> List[str]:
+    """id посилань з inline-клавіатури відповіді бота (кнопки select_link_<id>)"""
+    if not reply or not reply.get("reply_markup"):
+        return []
+    keyboard = json.loads(reply["reply_markup"]).get("inline_keyboard", [])
+    return [
+        button["callback_data"].rsplit("_", 1)[1]
+        for row in keyboard for button in row
+        if button.get("callback_data", "").startswith("select_link_") and button["callback_data"] != "select_link_done"
+    ]
+
+
+async def wizard_user(api: FakeBotAPI, args, user_id: int, deadline: float):
+    """Закрите навантаження: майстер /setting_links одного адміністратора, крок за кроком"""
+    chat = {"id": user_id, "type": "private", "first_name": f"Користувач {user_id}"}
+    subject_id = (user_id % args.groups) * args.subjects + 1
+
+    async def step(update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        update_id = api.push_update(update)
+        try:
+            reply = await asyncio.wait_for(api.wait_reply(update_id), args.reply_timeout)
+        except asyncio.TimeoutError:
+            reply = None
+        await asyncio.sleep(args.think_time)
+        return reply
+
+    iteration = 0
+    while time.perf_counter() < deadline:
+        iteration += 1
+        await step(message_update(api, chat, user_id, "/setting_links"))
+        await step(callback_update(api, user_id, "select_action_edit"))
+        await step(callback_update(api, user_id, f"select_subject_{subject_id}"))
+        for link_type in WIZARD_TYPES:
+            await step(callback_update(api, user_id, f"select_type_{link_type}"))
+        # Список посилань вибраних типів (запит get_links_for_subject_types) — з нього беремо id
+        links = link_ids(await step(callback_update(api, user_id, "select_type_done")))
+        if not links or time.perf_counter() >= deadline:
+            continue
+        await step(callback_update(api, user_id, f"select_link_{links[0]}"))
+        await step(callback_update(api, user_id, "select_link_done"))
+        await step(message_update(api, chat, user_id, f"Посилання {iteration}"))
+        # Збереження (update_links)
+        await step(message_update(api, chat, user_id, "Пропустити"))
+
+
+async def wait_for_bot(api: FakeBotAPI):
+    print("Чекаю, поки бот почне опитувати getUpdates...")
+    while not api.methods["getUpdates"]:
+        await asyncio.sleep(0.2)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--duration", type=float, default=60, help="тривалість, с")
+    parser.add_argument("--rate", type=float, default=50, help="групових команд на секунду")
+    parser.add_argument("--wizard-users", type=int, default=10, help="адміністраторів у майстрі одночасно")
+    parser.add_argument("--think-time", type=float, default=0.5, help="пауза між кроками майстра, с")
+    parser.add_argument("--reply-timeout", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.05, help="затримка відповіді Bot API, с")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.01, help="частка 429 на sendMessage/edit*")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=1000)
+    parser.add_argument("--subscribers", type=int, default=1)
+    parser.add_argument("--subjects", type=int, default=8)
+    parser.add_argument("--seed", action="store_true", help="засіяти BENCH_DATABASE_URL (як benchmarks.scale)")
+    parser.add_argument("--output", help="зберегти звіт у JSON")
+    args = parser.parse_args()
+
+    if args.seed:
+        # benchmarks.scale при імпорті підміняє DATABASE_URL на BENCH_DATABASE_URL
+        from benchmarks.scale import seed
+        from database.database import async_engine
+        await seed(Namespace(groups=args.groups, chats=args.chats, subscribers=args.subscribers,
+                             subjects=args.subjects, classes=4, links=1))
+        await async_engine.dispose()
+
+    api = FakeBotAPI(args.latency, args.jitter, args.error_rate, args.retry_after)
+    runner = await api.start(args.host, args.port)
+    print(f"Fake Bot API: http://{args.host}:{args.port}")
+    try:
+        await wait_for_bot(api)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            group_traffic(api, args, deadline),
+            *(wizard_user(api, args, user_id, deadline)
+              for user_id in range(1, min(args.wizard_users, args.chats) + 1)),
+        )
+        elapsed = time.perf_counter() - started
+        # Даємо боту дообробити хвіст черги
+        await asyncio.sleep(args.reply_timeout)
+        report = api.report(elapsed)
+    finally:
+        await runner.cleanup()
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump({"params": vars(args), "report": report}, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,11 @@
+from aiogram.filters import Filter
+from aiogram.types import Message
+
+from config.settings import SUPERUSER_IDS
+
+
+class IsSuperuser(Filter):
+    """Операторські команди; для інших користувачів команда просто не спрацьовує"""
+
+    async def __call__(self, message: Message) -> bool:
+        return message.from_user is not None and message.from_user.id in SUPERUSER_IDS
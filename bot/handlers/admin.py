@@ -11,8 +11,8 @@ from database.crud import (
     get_all_university_groups_by_admin, get_university_group_by_id
 )
 from database.schedule_crud import (
-    get_subjects_for_group, update_link,create_link_for_subject, get_links_for_subject, get_subject_by_id,
-    get_links_by_owner, delete_link, get_link_by_id
+    get_subjects_for_group, create_link_for_subject, get_links_for_subject_types, get_subject_by_id,
+    get_links_by_owner, update_links, delete_links
 )
 from bot.keyboards.admin_kb import build_groups_keyboard, build_subjects_keyboard, build_links_list_keyboard, \
     build_type_class_keyboard, build_action_keyboard, build_skip_keyboard
@@ -201,18 +201,22 @@ async def process_link_type(callback_query: CallbackQuery, state: FSMContext):
             group_id = state_data["group_id"]
             subject_id = state_data["subject_id"]
 
-            all_links = []
-            for class_type in selected:
-                links = await get_links_for_subject(
-                    db, int(group_id), int(subject_id), class_type, callback_query.from_user.id
-                )
-                all_links.extend(links)
+            links = await get_links_for_subject_types(
+                db, int(group_id), int(subject_id), selected, callback_query.from_user.id
+            )
 
-            if not all_links:
+            if not links:
                 await callback_query.message.edit_text("❌ Посилання не знайдені для вибраних типів.")
                 await state.clear()
                 return
 
+            # Список посилань зберігаємо у стані, щоб перемикання чекбоксів не ходило в БД
+            all_links = [
+                {"id": link.id, "name_link": link.name_link, "class_type": link.class_type}
+                for link in links
+            ]
+            await state.update_data(links=all_links)
+
             text = "Оберіть посилання для вибраних типів занять:"
             keyboard = build_links_list_keyboard(all_links)
             await callback_query.message.edit_text(text, reply_markup=keyboard, parse_mode="HTML")
@@ -285,18 +289,8 @@ async def process_deleting_link(callback_query: CallbackQuery, state: FSMContext
     data = callback_query.data.split("_", 2)[2]
     state_data = await state.get_data()
     selected = state_data.get("selected_links", [])
-    db = AsyncSessionLocal()
+    all_links = state_data.get("links", [])
     try:
-        group_id = state_data.get("group_id")
-        subject_id = state_data.get("subject_id")
-        selected_types = state_data.get("selected_types")
-
-        all_links = []
-        for class_type in selected_types:
-            links = await get_links_for_subject(
-                db, int(group_id), int(subject_id), class_type, callback_query.from_user.id
-            )
-            all_links.extend(links)
         if data == "done":
             if not selected:
                 await callback_query.message.edit_text(text="⚠️ Ви не вибрали жодного посилання!",
@@ -305,13 +299,19 @@ async def process_deleting_link(callback_query: CallbackQuery, state: FSMContext
                 return
 
             if state_data["action"] == "delete":
-                subject_name = (await get_subject_by_id(db, int(state_data["subject_id"]))).name
+                db = AsyncSessionLocal()
+                try:
+                    subject_name = (await get_subject_by_id(db, int(state_data["subject_id"]))).name
+                    deleted = await delete_links(db, selected, callback_query.from_user.id)
+                finally:
+                    await db.close()
+
+                deleted_ids = {link.id for link in deleted}
                 text = f"Посилання для предмету {subject_name}\n"
-                for link_id in selected:
-                    link = await get_link_by_id(db, int(link_id))
-                    result = await delete_link(db, int(link_id))
-                    text += f"{link.name_link}({link.class_type})"
-                    text += "✅ видалено\n" if result else "❌ не видалено\n"
+                for link in all_links:
+                    if link["id"] in selected:
+                        text += f"{link['name_link']}({link['class_type']})"
+                        text += "✅ видалено\n" if link["id"] in deleted_ids else "❌ не видалено\n"
                 await callback_query.message.edit_text(text=text)
                 await state.clear()
                 return
@@ -334,8 +334,6 @@ async def process_deleting_link(callback_query: CallbackQuery, state: FSMContext
     except Exception as e:
         await callback_query.message.edit_text(f"❌ Помилка при видаленні. Спробуйте знову або напишіть @shallbewolk")
         logger.error(f"Сталася помилка при видаленні:{e}")
-    finally:
-        await db.close()
 
 
 @router.message(ChangeLinkStates.waiting_for_new_name_link)
@@ -370,8 +368,8 @@ async def process_new_link(message: Message, state: FSMContext):
         selected_links = data.get("selected_links")
         subject_name = (await get_subject_by_id(db, int(data["subject_id"]))).name
         text = f"Посилання для предмету {subject_name}\n"
-        for link_id in selected_links:
-            new_class_link = await update_link(db, int(link_id), data["new_name_link"], new_link)
+        updated_links = await update_links(db, selected_links, message.from_user.id, data["new_name_link"], new_link)
+        for new_class_link in updated_links:
             text += f"{new_class_link.name_link}({new_class_link.class_type}) було оновлено\n"
         await message.answer(text=text)
         await state.clear()
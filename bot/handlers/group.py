@@ -1,16 +1,20 @@
-from aiogram import Router
-from aiogram.filters import Command
+from aiogram import F, Router
+from aiogram.filters import Command, ChatMemberUpdatedFilter, LEAVE_TRANSITION
 from aiogram.types import Message, ChatMemberUpdated
 from sqlalchemy.exc import SQLAlchemyError
 from database.database import AsyncSessionLocal
 from database.crud import (
     create_university_group, create_telegram_chat, get_telegram_chat_by_chat_id, get_university_group_by_id,
-    cleanup_unused_university_groups, switch_telegram_chat_group, get_university_group_by_cist_id,
-    add_private_subscriber, remove_private_subscriber, delete_telegram_chat
+    switch_telegram_chat_group, get_university_group_by_cist_id,
+    add_private_subscriber, remove_private_subscriber, delete_telegram_chat,
+    delete_telegram_chats_by_chat_ids, delete_private_subscriptions_by_users
 )
 from services.schedule_api import ScheduleAPI
-from services.schedule_sync import initial_sync_on_register, load_subjects_for_group
+from services.schedule_sync import initial_sync_on_register, load_subjects_for_group, refresh_if_stale
+from services.chat_reaper import migrate_chat
+from utils.metrics import chats_reaped
 from bot.filters.admin_filter import IsGroupAdmin
+from config.settings import SYNC_MODE
 from database.schedule_crud import (
     get_schedule_for_date,
     get_schedule_for_week,
@@ -25,6 +29,14 @@ logger = logging.getLogger(__name__)
 api_client = ScheduleAPI()
 router = Router()
 
+# Обіцянки в текстах реєстрації залежать від режиму синхронізації з CIST
+if SYNC_MODE == "adaptive":
+    SYNC_NOTE = "Оновлюватиме розклад кілька разів на день, частіше — перед парами"
+    RETRY_NOTE = "Розклад буде завантажено автоматично протягом кількох годин."
+else:
+    SYNC_NOTE = "Оновить розклад щодня о 5:00"
+    RETRY_NOTE = "Розклад буде завантажено автоматично о 5:00 ранку."
+
 
 def format_schedule_message(group_name: str, schedule: list, is_week: bool):
     if not schedule:
@@ -120,6 +132,9 @@ async def cmd_register(message: Message):
                 admin_user_id=user_id,
                 admin_username=username
             )
+            if not telegram_chat:
+                await waiting_msg.edit_text("ℹ️ Група вже зареєстрована!")
+                return
 
             await waiting_msg.edit_text(
                 f"✅ Групу знайдено!\n"
@@ -148,7 +163,7 @@ async def cmd_register(message: Message):
                     f"🔔 Бот автоматично:\n"
                     f"• Відправить розклад щодня о 7:45\n"
                     f"• Надішле нагадування на початку кожної пари\n"
-                    f"• Оновить розклад щодня о 5:00\n\n"
+                    f"• {SYNC_NOTE}\n\n"
                     f"⚠️ Тільки адміністратор може використовувати команди управління ботом у цій групі!"
                 )
             else:
@@ -156,7 +171,7 @@ async def cmd_register(message: Message):
                     f"⚠️ Група зареєстрована, але не вдалося завантажити розклад.\n\n"
                     f"📚 {group_name}\n"
                     f"👨‍💼 Адміністратор: @{username or 'ви'}\n\n"
-                    f"Розклад буде завантажено автоматично о 5:00 ранку.\n"
+                    f"{RETRY_NOTE}\n"
                     f"Або спробуйте команду /sync_schedule пізніше."
                 )
         except Exception as e:
@@ -219,8 +234,6 @@ async def cmd_change_group(message: Message):
 
             await switch_telegram_chat_group(db, chat_id, new_university_group.id)
 
-            await cleanup_unused_university_groups(db)
-
             if sync_success:
                 await message.answer(
                     f"✅ Чат успішно переключено на групу <b>{new_group_name}</b>!\n"
@@ -256,6 +269,8 @@ async def cmd_schedule_today(message: Message):
         formatted_message = format_schedule_message(university_group.name, schedule, is_week=False)
         await message.answer(formatted_message, parse_mode="HTML")
 
+    refresh_if_stale(university_group)
+
 
 @router.message(Command("schedule_week"))
 async def cmd_schedule_week(message: Message):
@@ -277,6 +292,8 @@ async def cmd_schedule_week(message: Message):
         formatted_message = format_schedule_message(university_group.name, schedule, is_week=True)
         await message.answer(formatted_message, parse_mode="HTML")
 
+    refresh_if_stale(university_group)
+
 
 @router.message(Command("info"))
 async def cmd_info(message: Message):
@@ -425,6 +442,31 @@ async def cmd_delete_chat(message: Message):
             )
 
 
+@router.my_chat_member(ChatMemberUpdatedFilter(member_status_changed=LEAVE_TRANSITION))
+async def on_bot_removed(event: ChatMemberUpdated):
+    """Бота видалили з групи або користувач заблокував бота: прибираємо їх із розсилок"""
+    try:
+        async with AsyncSessionLocal() as db:
+            if event.chat.type == "private":
+                deleted = await delete_private_subscriptions_by_users(db, [event.chat.id])
+                kind = "private"
+            else:
+                deleted = await delete_telegram_chats_by_chat_ids(db, [event.chat.id])
+                kind = "group"
+    except SQLAlchemyError as e:
+        logger.exception(f"Помилка при видаленні чата {event.chat.id} після видалення бота: {e}")
+        return
+    if deleted:
+        chats_reaped.inc(deleted, kind=kind)
+        logger.info(f"Бота видалено з чату {event.chat.id}, видалено записів: {deleted}")
+
+
+@router.message(F.migrate_to_chat_id)
+async def on_chat_migrated(message: Message):
+    """Групу перетворено на супергрупу: реєстрація переїжджає на новий chat_id"""
+    await migrate_chat(message.chat.id, message.migrate_to_chat_id)
+
+
 @router.my_chat_member()
 async def on_bot_added(event: ChatMemberUpdated):
     if event.new_chat_member.status in ["member", "administrator"]:
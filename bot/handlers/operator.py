@@ -0,0 +1,170 @@
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import BufferedInputFile, Message
+from datetime import datetime, timedelta
+import html
+import logging
+
+from bot.filters.superuser_filter import IsSuperuser
+from config.settings import PROFILE_MAX_SECONDS
+from database.database import async_engine, AsyncSessionLocal
+from database.models import KYIV_TZ
+from database.sync_crud import get_sync_group_summaries, get_sync_totals, get_sync_error_counts
+from utils.profiling import (
+    profiling_lock, sample_loop, collapsed_stacks, top_functions, cprofile_loop, tracemalloc_diff, parse_duration
+)
+from utils.stats import stats
+from utils.watchdog import watchdog
+
+logger = logging.getLogger(__name__)
+
+router = Router()
+router.message.filter(IsSuperuser())
+
+
+@router.message(Command("watchdog"))
+async def cmd_watchdog(message: Message, command: CommandObject):
+    """/watchdog [on|off] — стан watchdog event loop, увімкнення і вимкнення без перезапуску"""
+    action = (command.args or "").strip().lower()
+    if action == "on":
+        watchdog.start()
+    elif action == "off":
+        watchdog.stop()
+    elif action:
+        await message.answer("Використання: /watchdog [on|off]")
+        return
+
+    text = (
+        f"🐕 <b>Watchdog event loop:</b> {'увімкнено' if watchdog.enabled else 'вимкнено'}\n"
+        f"Поріг: {watchdog.threshold * 1000:.0f} мс\n"
+        f"Лаг зараз: {watchdog.last_lag * 1000:.1f} мс, максимум: {watchdog.max_lag * 1000:.1f} мс\n"
+        f"Блокувань понад поріг: {watchdog.blocked_count}"
+    )
+    if watchdog.stacks:
+        captured_at, stalled, stack = watchdog.stacks[-1]
+        tail = "".join(stack.splitlines(keepends=True)[-12:])
+        text += (
+            f"\n\nОстаннє: {datetime.fromtimestamp(captured_at).strftime('%d.%m %H:%M:%S')}, "
+            f"{stalled * 1000:.0f} мс\n<pre>{html.escape(tail[-3000:])}</pre>"
+        )
+    await message.answer(text, parse_mode="HTML")
+
+
+def format_ms(seconds) -> str:
+    return f"{seconds * 1000:.0f} мс" if seconds is not None else "—"
+
+
+def format_rate(rate) -> str:
+    return f"{rate * 100:.1f}%" if rate is not None else "—"
+
+
+@router.message(Command("stats"))
+async def cmd_stats(message: Message):
+    """/stats — стан процесу з лічильників у памʼяті, без запитів до БД"""
+    pool = async_engine.pool
+    lines = [
+        "📊 <b>Стан бота</b>",
+        "",
+        f"Апдейтів за хвилину (середнє за 5 хв): {stats.updates.total(5) / 5:.1f}, за годину: {stats.updates.total()}",
+        f"Хендлери p50/p95 (5 хв): {format_ms(stats.handler_latency.percentile(0.5))} / "
+        f"{format_ms(stats.handler_latency.percentile(0.95))}",
+        f"Пул БД: зайнято {pool.checkedout()} з {pool.size()}, понад пул {max(pool.overflow(), 0)}",
+        f"Повідомлень за годину: {stats.messages_sent.total()}, невдалих: {stats.messages_failed.total()}",
+        "Черга розсилок: " + (", ".join(f"{kind} {count}" for kind, count in stats.backlog.items()) or "0"),
+        f"Event loop: лаг {format_ms(watchdog.last_lag)}, максимум {format_ms(watchdog.max_lag)}"
+        + ("" if watchdog.enabled else " (watchdog вимкнено)"),
+    ]
+
+    sync = stats.last_sync
+    if sync:
+        lines.append(
+            f"Остання синхронізація: {datetime.fromtimestamp(sync.started_at).strftime('%d.%m %H:%M')}, "
+            f"{sync.duration:.0f} с, успішно {sync.ok}, з помилками {sync.failed}"
+        )
+    else:
+        lines.append("Остання синхронізація: ще не виконувалась у цьому процесі")
+
+    for name, cache in stats.caches.items():
+        lines.append(f"Кеш {name}: влучань {format_rate(cache.hit_rate())} за годину")
+
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+@router.message(Command("sync_report"))
+async def cmd_sync_report(message: Message, command: CommandObject):
+    """/sync_report [години] — підсумок журналу синхронізацій: найповільніші групи, найчастіші зміни, помилки"""
+    try:
+        hours = int(command.args) if command.args else 168
+    except ValueError:
+        await message.answer("Використання: /sync_report [години]")
+        return
+    since = datetime.now(KYIV_TZ) - timedelta(hours=hours)
+
+    async with AsyncSessionLocal() as db:
+        runs, groups, failures, cist_ms = await get_sync_totals(db, since)
+        slowest = await get_sync_group_summaries(db, since, order="duration", limit=5)
+        changing = await get_sync_group_summaries(db, since, order="changes", limit=5)
+        errors = await get_sync_error_counts(db, since)
+
+    if not runs:
+        await message.answer(f"За останні {hours} год синхронізацій не було")
+        return
+
+    lines = [
+        f"🔄 <b>Синхронізації за {hours} год</b>",
+        f"Спроб: {runs}, груп: {groups}, невдалих: {failures}, час запитів до CIST: {cist_ms / 1000:.0f} с",
+        "",
+        "<b>Найповільніші:</b>",
+    ]
+    lines += [
+        f"{html.escape(row.group_name)}: {row.avg_ms:.0f} мс (макс. {row.max_ms:.0f}), "
+        f"CIST {row.avg_cist_ms:.0f} мс, {row.avg_payload_bytes / 1024:.0f} КБ"
+        for row in slowest
+    ]
+    lines += ["", "<b>Найчастіше змінюються:</b>"]
+    lines += [f"{html.escape(row.group_name)}: {row.changes} змін за {row.runs} синхронізацій" for row in changing]
+    if errors:
+        lines += ["", "<b>Помилки:</b>"]
+        lines += [f"{html.escape(error)}: {count}" for error, count in errors]
+    await message.answer("\n".join(lines), parse_mode="HTML")
+
+
+PROFILE_MODES = ("sample", "cpu", "mem")
+
+
+@router.message(Command("profile"))
+async def cmd_profile(message: Message, command: CommandObject):
+    """
+    /profile [sample|cpu|mem] [секунди] — профілювання процесу без перезапуску.
+    sample: топ функцій + collapsed stacks для flamegraph; cpu: топ cProfile + .prof;
+    mem: різниця знімків tracemalloc.
+    """
+    args = (command.args or "").split()
+    mode = args[0].lower() if args else "sample"
+    if mode not in PROFILE_MODES or len(args) > 2:
+        await message.answer(f"Використання: /profile [{'|'.join(PROFILE_MODES)}] [секунди, до {PROFILE_MAX_SECONDS:.0f}]")
+        return
+    duration = parse_duration(args[1] if len(args) > 1 else None, 30, PROFILE_MAX_SECONDS)
+
+    if profiling_lock.locked():
+        await message.answer("⏳ Профілювання вже триває, дочекайтесь результату")
+        return
+
+    async with profiling_lock:
+        await message.answer(f"🔬 Профілювання ({mode}) на {duration:.0f} с...")
+        logger.info(f"Профілювання {mode} на {duration:.0f} с запустив {message.from_user.id}")
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+        if mode == "sample":
+            stacks = await sample_loop(duration)
+            summary = top_functions(stacks)
+            document = BufferedInputFile(collapsed_stacks(stacks).encode("utf-8"), f"profile-{stamp}.folded")
+        elif mode == "cpu":
+            summary, stats = await cprofile_loop(duration)
+            document = BufferedInputFile(stats, f"profile-{stamp}.prof")
+        else:
+            summary = await tracemalloc_diff(duration)
+            document = BufferedInputFile(summary.encode("utf-8"), f"memdiff-{stamp}.txt")
+
+    await message.answer(f"<pre>{html.escape(summary[:3800])}</pre>", parse_mode="HTML")
+    await message.answer_document(document)
@@ -1,6 +1,6 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 from typing import List
-from database.models import UniversityGroup, ClassLink
+from database.models import UniversityGroup
 
 
 TYPE_CLASSES = [
@@ -53,15 +53,16 @@ def build_type_class_keyboard(selected_types: list[str] = None) -> InlineKeyboar
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
-def build_links_list_keyboard(links: List["ClassLink"], selected_links: list[int | str] | None = None) -> InlineKeyboardMarkup:
+def build_links_list_keyboard(links: List[dict], selected_links: list[int | str] | None = None) -> InlineKeyboardMarkup:
+    """links — записи {"id", "name_link", "class_type"}, збережені у стані FSM"""
     if selected_links is None:
         selected_links = []
 
     buttons = []
     for link in links:
-        checked = "✅ " if int(link.id) in selected_links else "☐ "
-        text = f"{checked}{link.name_link}({link.class_type})"
-        buttons.append([InlineKeyboardButton(text=text, callback_data=f"select_link_{link.id}")])
+        checked = "✅ " if int(link["id"]) in selected_links else "☐ "
+        text = f"{checked}{link['name_link']}({link['class_type']})"
+        buttons.append([InlineKeyboardButton(text=text, callback_data=f"select_link_{link['id']}")])
 
     buttons.append([InlineKeyboardButton(text="Готово", callback_data="select_link_done")])
 
@@ -1,22 +1,52 @@
-import time
-
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.types import Message, CallbackQuery, TelegramObject
+
+from bot.middlewares.rate_limiter import RateLimit, RateLimiterBackend, MemoryRateLimiterBackend
+
+SPAM_TEXT = "🚫 Занадто швидко! Зачекай трохи перед новою командою."
 
 
 class AntiSpamMiddleware(BaseMiddleware):
-    def __init__(self, delay: int = 3):
+    """
+    Обмеження частоти за token bucket окремо для кожного користувача і кожного чату.
+    Працює і для повідомлень, і для callback-запитів; kind розділяє їхні відра.
+    """
+
+    def __init__(
+            self,
+            backend: RateLimiterBackend = None,
+            kind: str = "message",
+            user_rate: float = 1 / 3,
+            user_burst: int = 1,
+            chat_rate: float = 1 / 3,
+            chat_burst: int = 10,
+    ):
         super().__init__()
-        self.delay = delay
-        self.last_time = {}
+        self.backend = backend or MemoryRateLimiterBackend()
+        self.kind = kind
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+
+    async def __call__(self, handler, event: TelegramObject, data):
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
 
-    async def __call__(self, handler, event: Message, data):
-        user_id = event.from_user.id
-        now = time.time()
+        limits = []
+        if user:
+            limits.append(RateLimit(f"{self.kind}:user:{user.id}", self.user_rate, self.user_burst))
+        if chat and chat.type != "private":
+            limits.append(RateLimit(f"{self.kind}:chat:{chat.id}", self.chat_rate, self.chat_burst))
 
-        if user_id in self.last_time and now - self.last_time[user_id] < self.delay:
-            await event.answer("🚫 Занадто швидко! Зачекай трохи перед новою командою.")
+        # Токени списуються лише якщо їх вистачає в обох відрах: відмова чату не витрачає ліміт користувача
+        if limits and not await self.backend.hit_all(limits):
+            await self.reject(event)
             return
 
-        self.last_time[user_id] = now
-        return await handler(event, data)
\ No newline at end of file
+        return await handler(event, data)
+
+    @staticmethod
+    async def reject(event: TelegramObject):
+        if isinstance(event, (Message, CallbackQuery)):
+            await event.answer(SPAM_TEXT)
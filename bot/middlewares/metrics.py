@@ -0,0 +1,53 @@
+import time
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject
+
+from utils.metrics import handler_duration, telegram_duration, telegram_errors
+from utils.stats import stats
+
+
+class UpdateStatsMiddleware(BaseMiddleware):
+    """Outer middleware апдейтів: лічильник апдейтів для /stats (і тих, що не дійшли до хендлера)"""
+
+    async def __call__(self, handler, event: TelegramObject, data):
+        stats.updates.add()
+        return await handler(event, data)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Внутрішня middleware роутера: час роботи кожного хендлера (мітка handler — імʼя функції)"""
+
+    async def __call__(self, handler, event: TelegramObject, data):
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else type(event).__name__
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            duration = time.perf_counter() - started
+            handler_duration.observe(duration, handler=name)
+            stats.handler_latency.add(duration)
+
+
+class TelegramMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сесії бота: час кожного запиту до Bot API і помилки за типом"""
+
+    async def __call__(self, make_request, bot, method):
+        api_method = method.__api_method__
+        # sendMessage, sendDocument, copyMessage... — для лічильника відправлених повідомлень у /stats
+        is_message = (api_method.startswith("send") and api_method != "sendChatAction") or api_method == "copyMessage"
+        started = time.perf_counter()
+        try:
+            result = await make_request(bot, method)
+        except Exception as e:
+            telegram_errors.inc(method=api_method, error=type(e).__name__)
+            if is_message:
+                stats.messages_failed.add()
+            raise
+        finally:
+            telegram_duration.observe(time.perf_counter() - started, method=api_method)
+        if is_message:
+            stats.messages_sent.add()
+        return result
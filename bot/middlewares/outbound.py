@@ -0,0 +1,51 @@
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramMigrateToChat
+
+from services.chat_reaper import ChatReaper, is_dead_chat_error, migrate_chat
+from services.outbound import INTERACTIVE, OutboundScheduler, current_lane
+
+# Методи, на які діє ліміт Telegram на повідомлення
+LIMITED_PREFIXES = ("send", "edit", "copy", "forward")
+
+
+def is_limited(api_method: str) -> bool:
+    return api_method.startswith(LIMITED_PREFIXES) and api_method != "sendChatAction"
+
+
+class OutboundPriorityMiddleware(BaseRequestMiddleware):
+    """Middleware сесії бота: відправки і редагування чекають токен своєї смуги пріоритету"""
+
+    def __init__(self, scheduler: OutboundScheduler):
+        self.scheduler = scheduler
+
+    async def __call__(self, make_request, bot, method):
+        if is_limited(method.__api_method__):
+            await self.scheduler.acquire(current_lane())
+        return await make_request(bot, method)
+
+
+class ChatReaperMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сесії бота: недоступні одержувачі розсилок передаються в ChatReaper,
+    а відправку в групу, що стала супергрупою, повторюємо з новим chat_id.
+    Відповіді в interactive-смузі чатів не видаляють: це, зокрема, привітання в /private_me,
+    яке не доходить, доки користувач не натиснув /start
+    """
+
+    def __init__(self, reaper: ChatReaper):
+        self.reaper = reaper
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if not is_limited(method.__api_method__) or not isinstance(chat_id, int):
+            return await make_request(bot, method)
+        try:
+            return await make_request(bot, method)
+        except TelegramMigrateToChat as e:
+            await migrate_chat(chat_id, e.migrate_to_chat_id)
+            method.chat_id = e.migrate_to_chat_id
+            return await make_request(bot, method)
+        except Exception as e:
+            if current_lane() != INTERACTIVE and is_dead_chat_error(e):
+                self.reaper.report_dead(chat_id, e.message)
+            raise
@@ -0,0 +1,13 @@
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from database.query_log import query_unit
+
+
+class QueryCountMiddleware(BaseMiddleware):
+    """Outer middleware апдейтів: усі запити до БД під час обробки апдейту — одна одиниця роботи"""
+
+    async def __call__(self, handler, event: TelegramObject, data):
+        name = f"update {event.update_id} ({event.event_type})" if isinstance(event, Update) else type(event).__name__
+        with query_unit(name):
+            return await handler(event, data)
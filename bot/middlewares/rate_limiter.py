@@ -0,0 +1,83 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import NamedTuple, Sequence
+import logging
+import time
+
+from config.settings import RATE_LIMIT_BACKEND, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_IDLE_TTL
+from database.database import AsyncSessionLocal
+from database.rate_limit_crud import hit_rate_limit, hit_rate_limits
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    key: str
+    rate: float
+    burst: int
+
+
+class RateLimiterBackend(ABC):
+    """Сховище відер token bucket"""
+
+    @abstractmethod
+    async def hit_all(self, limits: Sequence[RateLimit]) -> bool:
+        """Взяти по токену з кожного відра, лише якщо токен є в усіх; False — ліміт вичерпано, нічого не списано"""
+
+    async def hit(self, key: str, rate: float, burst: int) -> bool:
+        return await self.hit_all([RateLimit(key, rate, burst)])
+
+
+class MemoryRateLimiterBackend(RateLimiterBackend):
+    """
+    Відра в памʼяті процесу. Кількість ключів обмежена max_keys,
+    ключі без активності довше idle_ttl секунд витісняються.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, idle_ttl: float = RATE_LIMIT_IDLE_TTL):
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl
+        # key -> (tokens, updated_at); порядок — від найдавніше оновленого
+        self.buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def hit_all(self, limits: Sequence[RateLimit]) -> bool:
+        now = time.monotonic()
+        self._evict(now)
+
+        refilled = []
+        for key, rate, burst in limits:
+            tokens, updated_at = self.buckets.pop(key, (burst, now))
+            refilled.append((key, min(burst, tokens + (now - updated_at) * rate)))
+        allowed = all(tokens >= 1 for _, tokens in refilled)
+
+        for key, tokens in refilled:
+            self.buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+    def _evict(self, now: float):
+        while self.buckets:
+            _, (_, updated_at) = next(iter(self.buckets.items()))
+            if len(self.buckets) < self.max_keys and now - updated_at < self.idle_ttl:
+                break
+            self.buckets.popitem(last=False)
+
+
+class PostgresRateLimiterBackend(RateLimiterBackend):
+    """Відра в UNLOGGED таблиці rate_limit_buckets — ліміти спільні для всіх реплік бота"""
+
+    async def hit_all(self, limits: Sequence[RateLimit]) -> bool:
+        try:
+            async with AsyncSessionLocal() as db:
+                if len(limits) == 1:
+                    return await hit_rate_limit(db, *limits[0])
+                return await hit_rate_limits(db, limits)
+        except Exception as e:
+            # Недоступна БД не повинна блокувати всі команди
+            logger.warning(f"Не вдалося перевірити ліміти {', '.join(limit.key for limit in limits)}: {e}")
+            return True
+
+
+def build_rate_limiter_backend() -> RateLimiterBackend:
+    if RATE_LIMIT_BACKEND == "postgres":
+        return PostgresRateLimiterBackend()
+    return MemoryRateLimiterBackend()
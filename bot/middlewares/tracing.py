@@ -0,0 +1,30 @@
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.tracing import tracer
+
+
+class TracingMiddleware(BaseMiddleware):
+    """Outer middleware апдейтів: кореневий спан на кожен апдейт"""
+
+    async def __call__(self, handler, event: TelegramObject, data):
+        user = data.get("event_from_user")
+        chat = data.get("event_chat")
+        attributes = {
+            "telegram.user_id": user.id if user else None,
+            "telegram.chat_id": chat.id if chat else None,
+        }
+        if isinstance(event, Update):
+            attributes["telegram.update_id"] = event.update_id
+            attributes["telegram.event_type"] = event.event_type
+        with tracer.span("telegram.update", root=True, **attributes):
+            return await handler(event, data)
+
+
+class TelegramTracingMiddleware(BaseRequestMiddleware):
+    """Middleware сесії бота: дочірній спан на кожен запит до Bot API (send_message тощо)"""
+
+    async def __call__(self, make_request, bot, method):
+        with tracer.span(f"telegram.{method.__api_method__}", **{"telegram.chat_id": getattr(method, "chat_id", None)}):
+            return await make_request(bot, method)
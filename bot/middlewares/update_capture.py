@@ -0,0 +1,162 @@
+"""
+Запис потоку апдейтів у файл для відтворення (benchmarks/replay.py).
+
+Формат — gzip JSON Lines, один рядок на апдейт: {"t": unix-час отримання, "u": апдейт}.
+Перед записом апдейт знеособлюється: id користувачів і чатів замінюються стабільним HMAC
+(знак id зберігається, тож групові чати лишаються відʼємними), імена, юзернейми й назви
+прибираються, текст, що не є командою, замінюється зірочками тієї ж довжини.
+"""
+import asyncio
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, List, Set
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+logger = logging.getLogger(__name__)
+
+# Поля-обʼєкти з id користувача або чату
+PEER_KEYS = {"from", "chat", "user", "sender_chat", "new_chat_member", "old_chat_member", "left_chat_member"}
+PEER_LIST_KEYS = {"new_chat_members"}
+# Числові поля з id чату
+CHAT_ID_KEYS = {"migrate_to_chat_id", "migrate_from_chat_id", "chat_id"}
+PERSONAL_KEYS = {"first_name", "last_name", "username", "title", "bio", "phone_number", "invite_link"}
+TEXT_KEYS = {"text", "caption"}
+
+
+def transform_ids(obj: Any, convert: Callable[[int], int]) -> Any:
+    """Застосувати convert до всіх id користувачів і чатів в апдейті (на місці)"""
+    if isinstance(obj, list):
+        for item in obj:
+            transform_ids(item, convert)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if key in PEER_KEYS and isinstance(value, dict) and isinstance(value.get("id"), int):
+                value["id"] = convert(value["id"])
+            elif key in PEER_LIST_KEYS and isinstance(value, list):
+                for peer in value:
+                    if isinstance(peer, dict) and isinstance(peer.get("id"), int):
+                        peer["id"] = convert(peer["id"])
+            elif key in CHAT_ID_KEYS and isinstance(value, int):
+                obj[key] = convert(value)
+            transform_ids(value, convert)
+    return obj
+
+
+def mask_text(text: str) -> str:
+    return text if text.startswith("/") else "*" * len(text)
+
+
+class Anonymizer:
+    def __init__(self, salt: bytes):
+        self.salt = salt
+
+    def pseudonym(self, value: int) -> int:
+        digest = hmac.new(self.salt, str(abs(value)).encode(), hashlib.sha256).digest()
+        pseudonym = int.from_bytes(digest[:6], "big") or 1
+        return -pseudonym if value < 0 else pseudonym
+
+    def anonymize(self, update: dict) -> dict:
+        transform_ids(update, self.pseudonym)
+        self._scrub(update)
+        return update
+
+    def _scrub(self, obj: Any):
+        if isinstance(obj, list):
+            for item in obj:
+                self._scrub(item)
+        elif isinstance(obj, dict):
+            for key in list(obj):
+                if key in PERSONAL_KEYS:
+                    del obj[key]
+                elif key in TEXT_KEYS and isinstance(obj[key], str):
+                    obj[key] = mask_text(obj[key])
+                else:
+                    self._scrub(obj[key])
+            # first_name обовʼязковий для User
+            if "is_bot" in obj:
+                obj["first_name"] = "user"
+
+
+class UpdateCaptureWriter:
+    """
+    Апдейти буферизуються в памʼяті; кожні flush_every записів пачка стискається і дописується у файл
+    в окремому потоці (asyncio.to_thread), тож запис не гальмує event loop у пікові години,
+    які й записуються. Пачки пишуться по черзі в порядку надходження.
+    """
+
+    def __init__(self, path: str, salt: bytes, flush_every: int = 100):
+        self.path = path
+        self.anonymizer = Anonymizer(salt)
+        self.flush_every = flush_every
+        self.buffer: List[str] = []
+        self._write_lock = asyncio.Lock()
+        self._writes: Set[asyncio.Task] = set()
+
+    def write(self, update: Update):
+        data = update.model_dump(mode="json", exclude_none=True, by_alias=True)
+        record = {"t": round(time.time(), 3), "u": self.anonymizer.anonymize(data)}
+        self.buffer.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if len(self.buffer) >= self.flush_every:
+            self._schedule_write()
+
+    def _schedule_write(self):
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        task = asyncio.create_task(self._write_lines(lines))
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    async def _write_lines(self, lines: List[str]):
+        async with self._write_lock:
+            await asyncio.to_thread(self._append, lines)
+
+    def _append(self, lines: List[str]):
+        try:
+            # Кожна пачка дописує окремий gzip member, gzip.open читає їх підряд
+            with gzip.open(self.path, "at", encoding="utf-8") as file:
+                file.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.error(f"Не вдалося записати апдейти в {self.path}: {e}")
+
+    async def flush(self):
+        """Записати залишок буфера і дочекатися всіх незавершених записів"""
+        self._schedule_write()
+        if self._writes:
+            await asyncio.gather(*self._writes)
+
+
+def read_capture(path: str):
+    """Записи файлу захоплення по черзі: (unix-час, апдейт як dict)"""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                yield record["t"], record["u"]
+
+
+class UpdateCaptureMiddleware(BaseMiddleware):
+    """Outer middleware апдейтів: записує кожен апдейт до обробки"""
+
+    def __init__(self, writer: UpdateCaptureWriter):
+        super().__init__()
+        self.writer = writer
+
+    async def __call__(self, handler, event: TelegramObject, data):
+        if isinstance(event, Update):
+            try:
+                self.writer.write(event)
+            except Exception as e:
+                logger.error(f"Не вдалося записати апдейт: {e}")
+        return await handler(event, data)
+
+
+def build_capture_writer(path: str, salt: str) -> UpdateCaptureWriter:
+    return UpdateCaptureWriter(path, salt.encode() if salt else os.urandom(16))
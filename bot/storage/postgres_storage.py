@@ -0,0 +1,152 @@
+import asyncio
+import copy
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StorageKey, StateType, DefaultKeyBuilder, KeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config.settings import FSM_STORAGE, FSM_CACHE_TTL, FSM_CACHE_MAX_KEYS, FSM_FLUSH_INTERVAL
+from database.database import AsyncSessionLocal
+from database.fsm_crud import get_fsm_record, save_fsm_records
+from utils.stats import stats
+
+logger = logging.getLogger(__name__)
+
+
+class CachedRecord:
+    __slots__ = ("state", "data", "expires_at")
+
+    def __init__(self, state: Optional[str], data: Dict[str, Any], expires_at: float):
+        self.state = state
+        self.data = data
+        self.expires_at = expires_at
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM сховище в таблиці fsm_storage з кешем у памʼяті процесу.
+
+    Читання йдуть з кешу (read-through, запис живе cache_ttl секунд), кеш — LRU на max_keys ключів,
+    прострочені й зайві записи витісняються під час читання.
+    Зміни пишуться в кеш одразу, а в БД — пачкою раз на flush_interval секунд (write-behind).
+    flush_interval=0 вмикає синхронний запис. cache_ttl=0 — режим для кількох реплік: читання з БД
+    на кожен запит і синхронний запис незалежно від flush_interval, інакше інша репліка прочитала б
+    застарілий рядок, поки зміна чекає в черзі.
+    """
+
+    def __init__(
+            self,
+            key_builder: Optional[KeyBuilder] = None,
+            cache_ttl: float = FSM_CACHE_TTL,
+            flush_interval: float = FSM_FLUSH_INTERVAL,
+            max_keys: int = FSM_CACHE_MAX_KEYS,
+    ):
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval if cache_ttl > 0 else 0
+        self.max_keys = max_keys
+        # Порядок — від найдавніше використаного
+        self.cache: OrderedDict[str, CachedRecord] = OrderedDict()
+        self.dirty: set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    async def _load(self, key: StorageKey) -> CachedRecord:
+        storage_key = self.key_builder.build(key)
+        now = time.monotonic()
+        record = self.cache.get(storage_key)
+        if record and (record.expires_at > now or storage_key in self.dirty):
+            stats.cache("fsm").hit()
+            self.cache.move_to_end(storage_key)
+            return record
+
+        stats.cache("fsm").miss()
+        async with AsyncSessionLocal() as db:
+            stored = await get_fsm_record(db, storage_key)
+        # Поки чекали БД, ключ могли змінити: незбережена зміна новіша за прочитане
+        if storage_key in self.dirty and storage_key in self.cache:
+            return self.cache[storage_key]
+        state, data = stored if stored else (None, {})
+        record = CachedRecord(state, data, now + self.cache_ttl)
+        self.cache[storage_key] = record
+        self.cache.move_to_end(storage_key)
+        self._evict(now)
+        return record
+
+    def _evict(self, now: float):
+        """Витіснити з початку LRU прострочені записи і ті, що понад max_keys; незбережені зміни лишаються"""
+        for _ in range(len(self.cache)):
+            key, record = next(iter(self.cache.items()))
+            if len(self.cache) <= self.max_keys and record.expires_at > now:
+                return
+            if key in self.dirty:
+                self.cache.move_to_end(key)
+            else:
+                del self.cache[key]
+
+    async def _mark_dirty(self, key: StorageKey):
+        self.dirty.add(self.key_builder.build(key))
+        if self.flush_interval <= 0:
+            await self.flush()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Повторюємо, поки є незбережені ключі (нові зміни або помилка запису)
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if not self.dirty:
+                return
+
+    async def flush(self):
+        """Записати в БД усі змінені ключі"""
+        async with self._flush_lock:
+            keys, self.dirty = self.dirty, set()
+            records = [
+                {"key": key, "state": self.cache[key].state, "data": self.cache[key].data}
+                for key in keys if key in self.cache
+            ]
+            if records:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await save_fsm_records(db, records)
+                except Exception as e:
+                    self.dirty |= keys
+                    logger.error(f"Не вдалося зберегти стан FSM ({len(records)} записів): {e}")
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._load(key)
+        record.state = state.state if isinstance(state, State) else state
+        await self._mark_dirty(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._load(key)).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+        record = await self._load(key)
+        record.data = copy.deepcopy(data)
+        await self._mark_dirty(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return copy.deepcopy((await self._load(key)).data)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+
+def build_fsm_storage() -> BaseStorage:
+    if FSM_STORAGE == "postgres":
+        return PostgresStorage()
+    return MemoryStorage()
@@ -5,6 +5,9 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 
+# Інший сервер Bot API (локальний telegram-bot-api або benchmarks/fake_bot_api.py), порожньо — api.telegram.org
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+
 SCHEDULE_API_URL = os.getenv("SCHEDULE_API_URL")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -14,4 +17,100 @@ if not DATABASE_URL:
 
 TIMEZONE = os.getenv("TIMEZONE", "Europe/Kyiv")
 
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
\ No newline at end of file
+# Telegram id операторів бота (через кому): /watchdog та інші службові команди
+SUPERUSER_IDS = {int(user_id) for user_id in os.getenv("SUPERUSER_IDS", "").split(",") if user_id.strip()}
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+# text або json (JSON Lines)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Ротація файлу: за розміром і за часом (when як у TimedRotatingFileHandler)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+# Ліміт INFO/DEBUG записів на секунду для гарячих логерів: logger=rate,...
+LOG_RATE_LIMITS = os.getenv(
+    "LOG_RATE_LIMITS", "aiogram.event=20,services.scheduler=20,services.message_sender=20"
+)
+
+# Порт HTTP сервера з /metrics у форматі Prometheus, 0 — вимкнено (за замовчуванням).
+# /metrics без автентифікації: слухаємо лише localhost, інший інтерфейс — явно через METRICS_HOST
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Лог повільних запитів і детектор N+1 (database/query_log.py), 1 — увімкнено
+QUERY_LOG = os.getenv("QUERY_LOG", "0") == "1"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+# Трасування (utils/tracing.py): off, console — у лог, file — JSON Lines у TRACE_FILE
+TRACING = os.getenv("TRACING", "off")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+
+# Запис знеособлених апдейтів для benchmarks/replay.py (gzip JSON Lines), порожньо — вимкнено.
+# Сіль HMAC для id; без неї id між перезапусками не збігаються
+UPDATE_CAPTURE_FILE = os.getenv("UPDATE_CAPTURE_FILE", "")
+UPDATE_CAPTURE_SALT = os.getenv("UPDATE_CAPTURE_SALT", "")
+
+# Watchdog event loop: лаг вимірюється кожні LOOP_WATCHDOG_INTERVAL с,
+# при блокуванні довшому за LOOP_LAG_THRESHOLD с логується стек коду, що блокує loop
+LOOP_WATCHDOG = os.getenv("LOOP_WATCHDOG", "1") == "1"
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", "0.25"))
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.5"))
+
+# Найдовша сесія /profile у секундах
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "120"))
+
+MAINTENANCE_BATCH_SIZE = int(os.getenv("MAINTENANCE_BATCH_SIZE", "1000"))
+
+# Щоденна розсилка: тексти готуються за DAILY_PREPARE_MINUTES хв до DAILY_SCHEDULE_TIME, відправка йде
+# з найбільшим темпом; якщо вона не встигає за DAILY_DEADLINE_MINUTES хв після початку, це видно в лозі і метриці
+DAILY_SCHEDULE_TIME = os.getenv("DAILY_SCHEDULE_TIME", "07:45")
+DAILY_PREPARE_MINUTES = int(os.getenv("DAILY_PREPARE_MINUTES", "5"))
+DAILY_DEADLINE_MINUTES = int(os.getenv("DAILY_DEADLINE_MINUTES", "10"))
+# Найбільший темп масових розсилок (повідомлень/с, загальний ліміт Telegram — близько 30) і паралельних відправок
+BROADCAST_MAX_RATE = float(os.getenv("BROADCAST_MAX_RATE", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+
+# Загальний ліміт відправок і редагувань повідомлень (повідомлень/с, 0 — без обмеження) і частка,
+# зарезервована для відповідей користувачам: розсилки й сповіщення не займуть її навіть у пік
+OUTBOUND_RATE = float(os.getenv("OUTBOUND_RATE", "25"))
+OUTBOUND_INTERACTIVE_RESERVE = float(os.getenv("OUTBOUND_INTERACTIVE_RESERVE", "0.3"))
+
+if not 0 <= OUTBOUND_INTERACTIVE_RESERVE < 1:
+    raise ValueError("OUTBOUND_INTERACTIVE_RESERVE має бути в межах [0, 1)")
+
+# Журнал синхронізацій sync_runs: записи пишуться пачками, старші за SYNC_RUNS_RETENTION_DAYS видаляються
+SYNC_JOURNAL_BATCH_SIZE = int(os.getenv("SYNC_JOURNAL_BATCH_SIZE", "50"))
+SYNC_JOURNAL_FLUSH_INTERVAL = float(os.getenv("SYNC_JOURNAL_FLUSH_INTERVAL", "5"))
+SYNC_RUNS_RETENTION_DAYS = int(os.getenv("SYNC_RUNS_RETENTION_DAYS", "90"))
+
+# adaptive — кожна група синхронізується за власним планом (services/sync_planner.py), nightly — усі о 5:00
+SYNC_MODE = os.getenv("SYNC_MODE", "adaptive")
+# Межі інтервалу синхронізації групи, секунди; новий інтервал — SYNC_DEFAULT_INTERVAL
+SYNC_MIN_INTERVAL = int(os.getenv("SYNC_MIN_INTERVAL", "1800"))
+SYNC_DEFAULT_INTERVAL = int(os.getenv("SYNC_DEFAULT_INTERVAL", "21600"))
+SYNC_MAX_INTERVAL = int(os.getenv("SYNC_MAX_INTERVAL", "86400"))
+# Групи з парами в найближчі SYNC_UPCOMING_HOURS годин синхронізуються не рідше, ніж раз на SYNC_UPCOMING_INTERVAL с
+SYNC_UPCOMING_HOURS = float(os.getenv("SYNC_UPCOMING_HOURS", "3"))
+SYNC_UPCOMING_INTERVAL = int(os.getenv("SYNC_UPCOMING_INTERVAL", "3600"))
+# /schedule_today і /schedule_week оновлюють у фоні розклад, синхронізований давніше, ніж SCHEDULE_STALE_AFTER с тому
+SCHEDULE_STALE_AFTER = int(os.getenv("SCHEDULE_STALE_AFTER", "10800"))
+# Бюджет запитів до CIST на годину для фонових синхронізацій (синхронізація групи — 2 запити),
+# при RATE_LIMIT_BACKEND=postgres — один на всі репліки
+SYNC_CIST_BUDGET_PER_HOUR = int(os.getenv("SYNC_CIST_BUDGET_PER_HOUR", "600"))
+
+SCHEDULE_PARTITIONS_AHEAD = int(os.getenv("SCHEDULE_PARTITIONS_AHEAD", "2"))
+
+# memory — окремо в кожному процесі, postgres — спільні ліміти для всіх реплік
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+RATE_LIMIT_IDLE_TTL = int(os.getenv("RATE_LIMIT_IDLE_TTL", "600"))
+
+# postgres — стан FSM переживає перезапуск і доступний усім реплікам, memory — стандартне сховище aiogram
+FSM_STORAGE = os.getenv("FSM_STORAGE", "postgres")
+# Кеш FSM у процесі з відкладеним записом у БД — для однієї репліки. Якщо одного користувача можуть
+# обробляти різні репліки, задайте FSM_CACHE_TTL=0: стан читається з БД на кожен апдейт і пишеться одразу
+FSM_CACHE_TTL = float(os.getenv("FSM_CACHE_TTL", "30"))
+FSM_CACHE_MAX_KEYS = int(os.getenv("FSM_CACHE_MAX_KEYS", "10000"))
+FSM_FLUSH_INTERVAL = float(os.getenv("FSM_FLUSH_INTERVAL", "0.5"))
\ No newline at end of file
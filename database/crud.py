@@ -1,36 +1,37 @@
 from sqlalchemy.future import select
-from sqlalchemy import update
+from sqlalchemy import update, delete, exists, literal, BigInteger
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
 from database.models import UniversityGroup, TelegramChat, PrivateSubscriber
-from typing import Optional, List
+from database.link_index import link_index
+from typing import Dict, Optional, List, NamedTuple
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
+from utils.metrics import track_db
 
 
+@track_db
 async def create_university_group(
         db: AsyncSession,
         cist_group_id: int,
         name: str
 ) -> UniversityGroup:
-    """Створити університетську групу"""
-    result = await db.execute(
-        select(UniversityGroup).where(UniversityGroup.cist_group_id == cist_group_id)
-    )
-    existing_group = result.scalars().first()
-
-    if existing_group:
-        return existing_group
-
-    university_group = UniversityGroup(
-        cist_group_id=cist_group_id,
-        name=name
-    )
-    db.add(university_group)
+    """Створити університетську групу або повернути існуючу з тим самим CIST ID"""
+    stmt = insert(UniversityGroup).values(cist_group_id=cist_group_id, name=name)
+    # no-op оновлення потрібне, щоб RETURNING повернув і вже існуючий рядок
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UniversityGroup.cist_group_id],
+        set_={"cist_group_id": stmt.excluded.cist_group_id}
+    ).returning(UniversityGroup)
+
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    university_group = result.scalars().one()
     await db.commit()
-    await db.refresh(university_group)
     return university_group
 
 
+@track_db
 async def get_university_group_by_id(db: AsyncSession, group_id: int) -> Optional[UniversityGroup]:
     """Отримати університетську групу за ID"""
     result = await db.execute(
@@ -39,6 +40,16 @@ async def get_university_group_by_id(db: AsyncSession, group_id: int) -> Optiona
     return result.scalars().first()
 
 
+@track_db
+async def mark_university_group_synced(db: AsyncSession, group_id: int, synced_at: datetime) -> None:
+    """Запамʼятати час успішної синхронізації розкладу групи"""
+    await db.execute(
+        update(UniversityGroup).where(UniversityGroup.id == group_id).values(last_synced_at=synced_at)
+    )
+    await db.commit()
+
+
+@track_db
 async def get_university_group_by_cist_id(db: AsyncSession, cist_group_id: int) -> Optional[UniversityGroup]:
     """Отримати університетську групу за CIST ID"""
     result = await db.execute(
@@ -47,6 +58,7 @@ async def get_university_group_by_cist_id(db: AsyncSession, cist_group_id: int)
     return result.scalars().first()
 
 
+@track_db
 async def update_university_group(
         db: AsyncSession,
         group_id: int,
@@ -54,16 +66,19 @@ async def update_university_group(
         new_cist_id: int
 ) -> Optional[UniversityGroup]:
     """Оновити дані університетської групи"""
-    await db.execute(
+    result = await db.execute(
         update(UniversityGroup)
         .where(UniversityGroup.id == group_id)
         .values(name=new_name, cist_group_id=new_cist_id)
+        .returning(UniversityGroup),
+        execution_options={"populate_existing": True}
     )
+    university_group = result.scalars().first()
     await db.commit()
-
-    return await get_university_group_by_id(db, group_id)
+    return university_group
 
 
+@track_db
 async def switch_telegram_chat_group(
         db: AsyncSession,
         chat_id: int,
@@ -72,49 +87,56 @@ async def switch_telegram_chat_group(
     """
     Переключити Telegram чат на іншу університетську групу
     """
-    await db.execute(
+    result = await db.execute(
         update(TelegramChat)
         .where(TelegramChat.chat_id == chat_id)
         .values(university_group_id=new_university_group_id)
+        .returning(TelegramChat),
+        execution_options={"populate_existing": True}
     )
+    telegram_chat = result.scalars().first()
     await db.commit()
-
-    return await get_telegram_chat_by_chat_id(db, chat_id)
+    return telegram_chat
 
 
-async def cleanup_unused_university_groups(db: AsyncSession) -> int:
+@track_db
+async def delete_unused_university_groups_batch(
+        db: AsyncSession,
+        created_before: datetime,
+        limit: int
+) -> List[int]:
     """
-    Видалити університетські групи, до яких не підключено жодного Telegram чату
+    Видалити порцію університетських груп, до яких не підключено жодного Telegram чату.
+    Групи, створені пізніше created_before, не чіпаємо: їх чат може ще реєструватися.
     """
-    from sqlalchemy import delete
-
-    # Знаходимо групи без чатів
-    subquery = select(TelegramChat.university_group_id).distinct()
-
+    batch = (
+        select(UniversityGroup.id)
+        .where(
+            ~exists().where(TelegramChat.university_group_id == UniversityGroup.id),
+            UniversityGroup.created_at < created_before
+        )
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
     result = await db.execute(
-        select(UniversityGroup)
-        .where(UniversityGroup.id.not_in(subquery))
+        delete(UniversityGroup)
+        .where(UniversityGroup.id.in_(batch.scalar_subquery()))
+        .returning(UniversityGroup.id)
     )
-    unused_groups = result.scalars().all()
-
-    count = len(unused_groups)
-
-    if count > 0:
-        await db.execute(
-            delete(UniversityGroup)
-            .where(UniversityGroup.id.not_in(subquery))
-        )
-        await db.commit()
-
-    return count
+    deleted_ids = result.scalars().all()
+    await db.commit()
+    link_index.drop_where(group_ids=deleted_ids)
+    return deleted_ids
 
 
+@track_db
 async def get_all_university_groups(db: AsyncSession) -> List[UniversityGroup]:
     """Отримати всі університетські групи"""
     result = await db.execute(select(UniversityGroup))
     return result.scalars().all()
 
 
+@track_db
 async def get_all_university_groups_by_admin(db: AsyncSession, admin_id: int) -> List[UniversityGroup]:
     """Отримати всі унікальні університетські групи, де користувач є адміністратором"""
     result = await db.execute(
@@ -126,26 +148,35 @@ async def get_all_university_groups_by_admin(db: AsyncSession, admin_id: int) ->
     return result.scalars().all()
 
 
+@track_db
 async def create_telegram_chat(
         db: AsyncSession,
         chat_id: int,
         university_group_id: int,
         admin_user_id: int,
         admin_username: Optional[str] = None
-) -> TelegramChat:
-    """Створити Telegram чат і зв'язати з університетською групою"""
-    telegram_chat = TelegramChat(
-        chat_id=chat_id,
-        university_group_id=university_group_id,
-        admin_user_id=admin_user_id,
-        admin_username=admin_username
+) -> Optional[TelegramChat]:
+    """
+    Створити Telegram чат і зв'язати з університетською групою.
+    Повертає None, якщо чат вже зареєстровано (наприклад, паралельним /register).
+    """
+    result = await db.execute(
+        insert(TelegramChat)
+        .values(
+            chat_id=chat_id,
+            university_group_id=university_group_id,
+            admin_user_id=admin_user_id,
+            admin_username=admin_username
+        )
+        .on_conflict_do_nothing(index_elements=[TelegramChat.chat_id])
+        .returning(TelegramChat)
     )
-    db.add(telegram_chat)
+    telegram_chat = result.scalars().first()
     await db.commit()
-    await db.refresh(telegram_chat)
     return telegram_chat
 
 
+@track_db
 async def get_telegram_chat_by_chat_id(db: AsyncSession, chat_id: int) -> Optional[TelegramChat]:
     """Отримати Telegram чат за chat_id"""
     result = await db.execute(
@@ -154,6 +185,7 @@ async def get_telegram_chat_by_chat_id(db: AsyncSession, chat_id: int) -> Option
     return result.scalars().first()
 
 
+@track_db
 async def get_telegram_chat_id_by_group_id(db: AsyncSession, group_id: int) -> Optional[int]:
     """Получить ID Telegram-чата по ID университетской группы"""
 
@@ -167,6 +199,30 @@ async def get_telegram_chat_id_by_group_id(db: AsyncSession, group_id: int) -> O
     return result.scalars().first()
 
 
+class ChatRow(NamedTuple):
+    """Легкий запис чату для планувальника та розсилок"""
+    chat_id: int
+    university_group_id: int
+    admin_user_id: int
+    group_name: str
+
+
+@track_db
+async def get_all_chat_rows(db: AsyncSession) -> List[ChatRow]:
+    """Отримати всі Telegram чати лише з потрібними для розсилок колонками"""
+    result = await db.execute(
+        select(
+            TelegramChat.chat_id,
+            TelegramChat.university_group_id,
+            TelegramChat.admin_user_id,
+            UniversityGroup.name
+        )
+        .join(UniversityGroup, UniversityGroup.id == TelegramChat.university_group_id)
+    )
+    return [ChatRow(*row) for row in result.all()]
+
+
+@track_db
 async def get_all_groups(db: AsyncSession) -> List[TelegramChat]:
     """Отримати всі Telegram чати"""
     result = await db.execute(
@@ -175,6 +231,7 @@ async def get_all_groups(db: AsyncSession) -> List[TelegramChat]:
     return result.scalars().all()
 
 
+@track_db
 async def get_telegram_chats_by_admin(db: AsyncSession, admin_user_id: int) -> List[TelegramChat]:
     """Отримати всі Telegram чати, де користувач є адміном"""
     result = await db.execute(
@@ -183,16 +240,18 @@ async def get_telegram_chats_by_admin(db: AsyncSession, admin_user_id: int) -> L
     return result.scalars().all()
 
 
+@track_db
 async def delete_telegram_chat(db: AsyncSession, chat: TelegramChat) -> None:
-    """Видалити чат"""
+    """Видалити чат (підписники видаляються каскадно на рівні БД)"""
     try:
-        await db.delete(chat)
+        await db.execute(delete(TelegramChat).where(TelegramChat.chat_id == chat.chat_id))
         await db.commit()
     except SQLAlchemyError:
         await db.rollback()
         raise
 
 
+@track_db
 async def is_group_admin(db: AsyncSession, chat_id: int, user_id: int) -> bool:
     """Перевірити, чи є користувач адміном групи"""
     telegram_chat = await get_telegram_chat_by_chat_id(db, chat_id)
@@ -201,6 +260,7 @@ async def is_group_admin(db: AsyncSession, chat_id: int, user_id: int) -> bool:
     return False
 
 
+@track_db
 async def get_private_subscriber(
         db: AsyncSession,
         user_id: int,
@@ -216,6 +276,7 @@ async def get_private_subscriber(
     return result.scalars().first()
 
 
+@track_db
 async def add_private_subscriber(
         db: AsyncSession,
         user_id: int,
@@ -223,21 +284,18 @@ async def add_private_subscriber(
         username: Optional[str] = None
 ) -> bool:
     """Додати користувача до списку приватних підписників"""
-    result = await get_private_subscriber(db, user_id, chat_id)
-    if result:
-        return False
-
-    subscriber = PrivateSubscriber(
-        user_id=user_id,
-        chat_id=chat_id,
-        username=username
+    result = await db.execute(
+        insert(PrivateSubscriber)
+        .values(user_id=user_id, chat_id=chat_id, username=username)
+        .on_conflict_do_nothing(index_elements=[PrivateSubscriber.user_id, PrivateSubscriber.chat_id])
+        .returning(PrivateSubscriber.id)
     )
-    db.add(subscriber)
+    added = result.scalar() is not None
     await db.commit()
-    await db.refresh(subscriber)
-    return True
+    return added
 
 
+@track_db
 async def get_private_subscribers_by_chat(
         db: AsyncSession,
         chat_id: int
@@ -249,16 +307,101 @@ async def get_private_subscribers_by_chat(
     return result.scalars().all()
 
 
+@track_db
+async def get_private_subscriber_ids_by_chat(
+        db: AsyncSession,
+        chat_id: int
+) -> List[int]:
+    """Отримати user_id всіх підписників певного Telegram чату"""
+    result = await db.execute(
+        select(PrivateSubscriber.user_id).where(PrivateSubscriber.chat_id == chat_id)
+    )
+    return result.scalars().all()
+
+
+@track_db
+async def get_private_subscriber_ids_by_chats(db: AsyncSession) -> Dict[int, List[int]]:
+    """Підписники всіх чатів одним запитом: chat_id -> [user_id]"""
+    result = await db.execute(
+        select(PrivateSubscriber.chat_id, PrivateSubscriber.user_id).order_by(PrivateSubscriber.id)
+    )
+    subscribers = {}
+    for chat_id, user_id in result.all():
+        subscribers.setdefault(chat_id, []).append(user_id)
+    return subscribers
+
+
+@track_db
 async def remove_private_subscriber(
         db: AsyncSession,
         user_id: int,
         chat_id: int
 ) -> bool:
     """Видалити користувача зі списку приватних підписників"""
-    subscriber = await get_private_subscriber(db, user_id, chat_id)
-    if subscriber:
-        await db.delete(subscriber)
-        await db.commit()
-        return True
+    result = await db.execute(
+        delete(PrivateSubscriber)
+        .where(PrivateSubscriber.user_id == user_id, PrivateSubscriber.chat_id == chat_id)
+        .returning(PrivateSubscriber.id)
+    )
+    removed = result.scalar() is not None
+    await db.commit()
+    return removed
 
-    return False
\ No newline at end of file
+
+@track_db
+async def delete_telegram_chats_by_chat_ids(db: AsyncSession, chat_ids: List[int]) -> int:
+    """Видалити чати за chat_id одним запитом (підписники видаляються каскадно на рівні БД)"""
+    result = await db.execute(
+        delete(TelegramChat).where(TelegramChat.chat_id.in_(chat_ids)).returning(TelegramChat.id)
+    )
+    deleted = len(result.all())
+    await db.commit()
+    return deleted
+
+
+@track_db
+async def delete_private_subscriptions_by_users(db: AsyncSession, user_ids: List[int]) -> int:
+    """Видалити всі особисті підписки користувачів (заблокували бота або видалили акаунт)"""
+    result = await db.execute(
+        delete(PrivateSubscriber).where(PrivateSubscriber.user_id.in_(user_ids)).returning(PrivateSubscriber.id)
+    )
+    deleted = len(result.all())
+    await db.commit()
+    return deleted
+
+
+@track_db
+async def migrate_telegram_chat_id(db: AsyncSession, old_chat_id: int, new_chat_id: int) -> bool:
+    """
+    Перенести реєстрацію групи на id супергрупи після міграції чату.
+    chat_id підписників оновлюється каскадно (ON UPDATE CASCADE). Якщо супергрупу вже
+    зареєстровано окремо, підписники старого чату переносяться до неї (крім тих, хто вже
+    підписаний), а стара реєстрація видаляється.
+    """
+    already_registered = await db.scalar(select(exists().where(TelegramChat.chat_id == new_chat_id)))
+    if already_registered:
+        await db.execute(
+            insert(PrivateSubscriber)
+            .from_select(
+                ["user_id", "username", "chat_id", "created_at"],
+                select(
+                    PrivateSubscriber.user_id,
+                    PrivateSubscriber.username,
+                    literal(new_chat_id, BigInteger),
+                    PrivateSubscriber.created_at
+                ).where(PrivateSubscriber.chat_id == old_chat_id)
+            )
+            .on_conflict_do_nothing(index_elements=[PrivateSubscriber.user_id, PrivateSubscriber.chat_id])
+        )
+        await db.execute(delete(TelegramChat).where(TelegramChat.chat_id == old_chat_id))
+        await db.commit()
+        return False
+    result = await db.execute(
+        update(TelegramChat)
+        .where(TelegramChat.chat_id == old_chat_id)
+        .values(chat_id=new_chat_id)
+        .returning(TelegramChat.id)
+    )
+    migrated = result.scalar() is not None
+    await db.commit()
+    return migrated
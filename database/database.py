@@ -1,8 +1,13 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
-from config.settings import DATABASE_URL
-from database.models import Base
+from config.settings import DATABASE_URL, QUERY_LOG
+from database.models import Base, KYIV_TZ
+from database.partitions import ensure_schedule_partitions
+from database.query_log import query_logger
+from datetime import datetime
+from utils.metrics import db_pool_checked_out, db_pool_overflow
+from utils.tracing import tracer, trace_engine
 import logging
 
 logger = logging.getLogger(__name__)
@@ -16,6 +21,14 @@ async_engine = create_async_engine(
     pool_recycle=3600,
 )
 
+if QUERY_LOG:
+    query_logger.install(async_engine.sync_engine)
+if tracer.enabled:
+    trace_engine(async_engine.sync_engine)
+
+db_pool_checked_out.set_function(lambda: async_engine.pool.checkedout())
+db_pool_overflow.set_function(lambda: max(async_engine.pool.overflow(), 0))
+
 AsyncSessionLocal = sessionmaker(
     async_engine,
     class_=AsyncSession,
@@ -27,6 +40,7 @@ AsyncSessionLocal = sessionmaker(
 async def init_db():
     async with async_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await ensure_schedule_partitions(conn, datetime.now(KYIV_TZ).date())
     logger.info("Асинхронну базу даних ініціалізовано")
 
 
@@ -0,0 +1,47 @@
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import FsmRecord
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from utils.metrics import track_db
+
+
+@track_db
+async def get_fsm_record(
+        db: AsyncSession,
+        key: str
+) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+    """Отримати стан і дані FSM за ключем"""
+    result = await db.execute(
+        select(FsmRecord.state, FsmRecord.data).where(FsmRecord.key == key)
+    )
+    row = result.first()
+    return (row.state, row.data) if row else None
+
+
+@track_db
+async def save_fsm_records(
+        db: AsyncSession,
+        records: List[Dict[str, Any]]
+) -> None:
+    """
+    Зберегти пачку записів FSM ({"key", "state", "data"}).
+    Порожні записи (без стану і даних) видаляються.
+    """
+    empty_keys = [record["key"] for record in records if record["state"] is None and not record["data"]]
+    filled = [record for record in records if record["state"] is not None or record["data"]]
+
+    if empty_keys:
+        await db.execute(delete(FsmRecord).where(FsmRecord.key.in_(empty_keys)))
+
+    if filled:
+        now = datetime.now(timezone.utc)
+        stmt = insert(FsmRecord)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FsmRecord.key],
+            set_={"state": stmt.excluded.state, "data": stmt.excluded.data, "updated_at": stmt.excluded.updated_at}
+        )
+        await db.execute(stmt, [{**record, "updated_at": now} for record in filled])
+
+    await db.commit()
@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import ClassLink
+from utils.stats import stats
+
+logger = logging.getLogger(__name__)
+
+LinkKey = Tuple[int, int, Optional[str], int]
+
+
+def render_link_line(link: ClassLink) -> str:
+    return f"🎥 <a href='{link.meeting_link}'>{link.name_link} ({link.class_type})</a>"
+
+
+class LinkIndex:
+    """
+    Індекс посилань у памʼяті процесу для сповіщень про початок пари:
+    (group_id, subject_id, class_type, owner_user_id) -> готові рядки посилань.
+
+    Прогрівається при старті, далі оновлюється функціями schedule_crud,
+    які змінюють посилання, тому при сповіщеннях запити до class_links не потрібні.
+    Зміни, зроблені іншими репліками, помічає refresh_if_changed: перед кожною пачкою сповіщень
+    він порівнює версію таблиці (кількість рядків, max(id), max(updated_at)) і за потреби прогріває індекс заново.
+    """
+
+    def __init__(self):
+        self.lines: Dict[LinkKey, Dict[int, str]] = {}
+        self.key_by_link: Dict[int, LinkKey] = {}
+        self.version: Optional[tuple] = None
+        self.warmed = False
+
+    @staticmethod
+    def key_of(link: ClassLink) -> LinkKey:
+        return int(link.university_group_id), int(link.subject_id), link.class_type, int(link.owner_user_id)
+
+    @staticmethod
+    async def load_version(db: AsyncSession) -> tuple:
+        result = await db.execute(
+            select(func.count(ClassLink.id), func.max(ClassLink.id), func.max(ClassLink.updated_at))
+        )
+        return tuple(result.one())
+
+    async def warm(self, db: AsyncSession):
+        # Версію читаємо до посилань: зміна між двома запитами лише спричинить ще одне прогрівання
+        version = await self.load_version(db)
+        result = await db.execute(select(ClassLink).order_by(ClassLink.id))
+        self.lines.clear()
+        self.key_by_link.clear()
+        for link in result.scalars():
+            self.put(link)
+        self.version = version
+        self.warmed = True
+        logger.info(f"Індекс посилань прогріто: {len(self.key_by_link)} посилань")
+
+    async def refresh_if_changed(self, db: AsyncSession):
+        """Прогріти індекс заново, якщо class_links змінили (зокрема інші репліки)"""
+        if not self.warmed:
+            return
+        if await self.load_version(db) != self.version:
+            logger.info("Посилання змінилися, індекс посилань прогрівається заново")
+            await self.warm(db)
+
+    def put(self, link: ClassLink):
+        self.remove(link.id)
+        key = self.key_of(link)
+        self.lines.setdefault(key, {})[link.id] = render_link_line(link)
+        self.key_by_link[link.id] = key
+
+    def remove(self, link_id: int):
+        key = self.key_by_link.pop(link_id, None)
+        if key is None:
+            return
+        lines = self.lines.get(key, {})
+        lines.pop(link_id, None)
+        if not lines:
+            self.lines.pop(key, None)
+
+    def drop_where(self, group_ids: Iterable[int] = (), subject_ids: Iterable[int] = ()):
+        """Прибрати посилання видалених груп або предметів (у БД вони видаляються каскадно)"""
+        group_ids, subject_ids = set(group_ids), set(subject_ids)
+        for link_id, key in list(self.key_by_link.items()):
+            if key[0] in group_ids or key[1] in subject_ids:
+                self.remove(link_id)
+
+    def get_lines(
+            self,
+            university_group_id: int,
+            subject_id: int,
+            class_type: Optional[str],
+            owner_user_id: int
+    ) -> Optional[List[str]]:
+        """Рядки посилань у порядку створення; None, якщо індекс ще не прогріто"""
+        if not self.warmed:
+            stats.cache("link_index").miss()
+            return None
+        stats.cache("link_index").hit()
+        if subject_id is None:
+            return []
+        lines = self.lines.get((int(university_group_id), int(subject_id), class_type, int(owner_user_id)), {})
+        return [lines[link_id] for link_id in sorted(lines)]
+
+
+link_index = LinkIndex()
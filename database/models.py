@@ -1,6 +1,7 @@
 from sqlalchemy import (
-    Column, Integer, String, ForeignKey, DateTime, Date, Time, Index, BigInteger
+    Column, Integer, String, ForeignKey, DateTime, Date, Time, Index, BigInteger, Float, Boolean
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 from zoneinfo import ZoneInfo
@@ -17,6 +18,12 @@ class UniversityGroup(Base):
     cist_group_id = Column(Integer, unique=True, nullable=False)
     name = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Час останньої успішної синхронізації з CIST
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)
+    # План адаптивної синхронізації (services/sync_planner.py)
+    next_sync_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    sync_interval = Column(Integer, nullable=True)
+    sync_failures = Column(Integer, nullable=False, default=0, server_default="0")
 
     subjects = relationship("Subject", back_populates="university_group", cascade="all, delete-orphan")
     telegram_chats = relationship("TelegramChat", back_populates="university_group", cascade="all, delete-orphan")
@@ -44,7 +51,9 @@ class PrivateSubscriber(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(BigInteger, nullable=False)
     username = Column(String, nullable=True)
-    chat_id = Column(BigInteger, ForeignKey("telegram_chats.chat_id", ondelete="CASCADE"), nullable=False)
+    chat_id = Column(
+        BigInteger, ForeignKey("telegram_chats.chat_id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False
+    )
     created_at = Column(DateTime, default=datetime.utcnow)
 
     chat = relationship("TelegramChat", back_populates="private_subscribers")
@@ -73,13 +82,17 @@ class Subject(Base):
 class ScheduleClass(Base):
     __tablename__ = "schedule_classes"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     university_group_id = Column(Integer, ForeignKey("university_groups.id", ondelete="CASCADE"), nullable=False)
     subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="SET NULL"), nullable=True)
-    date = Column(Date, nullable=False)
+    # Таблиця партиціонована по місяцях за date (database/partitions.py), тому date входить у первинний ключ
+    date = Column(Date, primary_key=True)
     day_of_week = Column(String, nullable=False)
     time_start = Column(Time, nullable=False)
     time_end = Column(Time, nullable=False)
+    # Момент початку/кінця пари з часовою зоною, для пошуку пар у часовому вікні
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
     subject_name = Column(String, nullable=False)
     subject_brief = Column(String)
     class_type = Column(String)
@@ -92,6 +105,8 @@ class ScheduleClass(Base):
     __table_args__ = (
         Index('ix_uni_group_date', 'university_group_id', 'date'),
         Index('ix_subject_id', 'subject_id'),
+        Index('ix_schedule_starts_at', 'starts_at'),
+        {"postgresql_partition_by": "RANGE (date)"},
     )
 
 
@@ -118,4 +133,51 @@ class ClassLink(Base):
             'subject_id',
             'class_type'
         ),
-    )
\ No newline at end of file
+    )
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_rate_limit_updated_at', 'updated_at'),
+        {"prefixes": ["UNLOGGED"]},
+    )
+
+
+class FsmRecord(Base):
+    __tablename__ = "fsm_storage"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(JSONB, nullable=False, default=dict)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class SyncRun(Base):
+    """Журнал синхронізацій розкладу: один запис на спробу синхронізації групи"""
+    __tablename__ = "sync_runs"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    university_group_id = Column(Integer, ForeignKey("university_groups.id", ondelete="CASCADE"), nullable=False)
+    trigger = Column(String, nullable=False)
+    attempt = Column(Integer, nullable=False, default=1)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    cist_ms = Column(Float, nullable=False, default=0)
+    cist_requests = Column(Integer, nullable=False, default=0)
+    payload_bytes = Column(Integer, nullable=False, default=0)
+    rows_inserted = Column(Integer, nullable=False, default=0)
+    rows_updated = Column(Integer, nullable=False, default=0)
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index('ix_sync_runs_group_started', 'university_group_id', 'started_at'),
+        Index('ix_sync_runs_started_at', 'started_at'),
+    )
@@ -0,0 +1,80 @@
+from datetime import date
+from typing import List
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config.settings import SCHEDULE_PARTITIONS_AHEAD
+from database.models import ScheduleClass
+
+SCHEDULE_TABLE = ScheduleClass.__tablename__
+
+PARTITION_NAME_RE = re.compile(rf"^{SCHEDULE_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Назва місячної партиції schedule_classes, наприклад schedule_classes_y2025m09"""
+    return f"{SCHEDULE_TABLE}_y{month.year}m{month.month:02d}"
+
+
+async def get_schedule_partitions(conn: AsyncConnection) -> List[date]:
+    """Отримати початки місяців усіх існуючих партицій schedule_classes"""
+    result = await conn.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": SCHEDULE_TABLE}
+    )
+    months = []
+    for name in result.scalars():
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def ensure_schedule_partitions(
+        conn: AsyncConnection,
+        today: date,
+        months_ahead: int = SCHEDULE_PARTITIONS_AHEAD
+) -> List[str]:
+    """Створити партиції schedule_classes на поточний місяць і months_ahead місяців наперед"""
+    existing = set(await get_schedule_partitions(conn))
+    created = []
+    for offset in range(months_ahead + 1):
+        lower = add_months(month_start(today), offset)
+        if lower in existing:
+            continue
+        upper = add_months(lower, 1)
+        name = partition_name(lower)
+        await conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {SCHEDULE_TABLE} "
+            f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+
+async def drop_expired_schedule_partitions(conn: AsyncConnection, today: date) -> List[str]:
+    """Видалити цілі партиції schedule_classes за місяці, що вже закінчилися"""
+    dropped = []
+    for month in await get_schedule_partitions(conn):
+        if add_months(month, 1) > month_start(today):
+            continue
+        name = partition_name(month)
+        await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        dropped.append(name)
+    return dropped
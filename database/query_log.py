@@ -0,0 +1,168 @@
+"""
+Лог повільних запитів і детектор N+1 на подіях SQLAlchemy.
+
+Вмикається QUERY_LOG=1. Кожен запит довший за SLOW_QUERY_MS логується разом з місцем виклику.
+Запити рахуються в межах одиниці роботи (апдейт або задача планувальника, див. query_unit);
+якщо однаковий за формою запит виконується більше N_PLUS_ONE_THRESHOLD разів — попередження.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import functools
+import logging
+import os
+import re
+import sys
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD
+
+try:
+    import greenlet
+except ImportError:  # pragma: no cover - без greenlet async engine не працює
+    greenlet = None
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SKIPPED_FILES = (os.path.abspath(__file__), os.path.join(PROJECT_ROOT, "utils", "metrics.py"))
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![$\w])\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|\$\d+|%\(\w+\)s)(?:\s*,\s*(?:\?|\$\d+|%\(\w+\)s))+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Форма запиту без літералів і зі згорнутими IN-списками"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("(...)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+def find_call_site(depth: int = 3) -> str:
+    """
+    Перші depth кадрів коду проєкту, з яких виконано запит.
+    Async-запити SQLAlchemy виконує в дочірньому greenlet, тому після його кадрів
+    обходимо стек батьківського greenlet, де лежать корутини бота.
+    """
+    sites = []
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent() if greenlet else None
+    while len(sites) < depth:
+        while frame is not None and len(sites) < depth:
+            filename = frame.f_code.co_filename
+            if (filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+                    and filename not in SKIPPED_FILES):
+                sites.append(
+                    f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} {frame.f_code.co_name}"
+                )
+            frame = frame.f_back
+        if current is None or current.parent is None:
+            break
+        current = current.parent
+        frame = current.gr_frame
+    return " <- ".join(sites) or "?"
+
+
+class QueryUnit:
+    """Лічильник запитів однієї одиниці роботи"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+        self.reported: set[str] = set()
+
+
+_current_unit: ContextVar[Optional[QueryUnit]] = ContextVar("query_unit", default=None)
+
+
+class QueryLogger:
+    def __init__(self, slow_query_ms: float, n_plus_one_threshold: int):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.enabled = False
+
+    def install(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+        self.enabled = True
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Час старту — на контексті виконання, а не в стеку зʼєднання: запит, що впав з помилкою,
+        # не доходить до after_cursor_execute і не зсуває час наступним запитам
+        if context is not None:
+            context.query_started_at = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started_at = getattr(context, "query_started_at", None)
+        if started_at is None:
+            return
+        duration = time.perf_counter() - started_at
+        shape = None
+
+        if duration >= self.slow_query_seconds:
+            shape = statement_shape(statement)
+            logger.warning(
+                f"Повільний запит {duration * 1000:.0f} мс ({find_call_site()}): {shape[:500]}"
+            )
+
+        unit = _current_unit.get()
+        if unit is None:
+            return
+        shape = shape or statement_shape(statement)
+        unit.total += 1
+        unit.duration += duration
+        unit.shapes[shape] += 1
+        if unit.shapes[shape] > self.n_plus_one_threshold and shape not in unit.reported:
+            unit.reported.add(shape)
+            logger.warning(
+                f"Можливий N+1 у {unit.name}: запит виконано більше {self.n_plus_one_threshold} разів "
+                f"({find_call_site()}): {shape[:500]}"
+            )
+
+
+@contextmanager
+def query_unit(name: str):
+    """
+    Рахувати запити всередині блоку як одну одиницю роботи.
+    Вкладені одиниці (апдейт усередині replay) після завершення додають свої підсумки до зовнішньої
+    """
+    if not query_logger.enabled:
+        yield None
+        return
+
+    parent = _current_unit.get()
+    unit = QueryUnit(name)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+    finally:
+        _current_unit.reset(token)
+        if parent is not None:
+            parent.total += unit.total
+            parent.duration += unit.duration
+        if unit.total:
+            logger.info(f"{unit.name}: {unit.total} запитів до БД, {unit.duration * 1000:.0f} мс")
+
+
+def count_queries(name: str):
+    """Декоратор для async функцій (задач планувальника): одна одиниця роботи на виклик"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with query_unit(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+query_logger = QueryLogger(SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD)
@@ -0,0 +1,105 @@
+from sqlalchemy import text, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import RateLimitBucket
+from datetime import datetime
+from typing import Sequence, Tuple
+from utils.metrics import track_db
+
+# Скільки токенів у відрі зараз: старий залишок плюс поповнення за час, що минув
+REFILLED_TOKENS = (
+    "LEAST(CAST(:burst AS double precision), bucket.tokens + "
+    "EXTRACT(EPOCH FROM now() - bucket.updated_at)::double precision * CAST(:rate AS double precision))"
+)
+
+# Token bucket одним запитом: поповнюємо відро і знімаємо cost токенів, якщо вони є
+HIT_BUCKET_SQL = text(f"""
+    INSERT INTO rate_limit_buckets AS bucket (key, tokens, allowed, updated_at)
+    VALUES (:key, CAST(:burst AS double precision) - CAST(:cost AS double precision), true, now())
+    ON CONFLICT (key) DO UPDATE SET
+        allowed = {REFILLED_TOKENS} >= CAST(:cost AS double precision),
+        tokens = {REFILLED_TOKENS} - CASE
+            WHEN {REFILLED_TOKENS} >= CAST(:cost AS double precision) THEN CAST(:cost AS double precision) ELSE 0
+        END,
+        updated_at = now()
+    RETURNING allowed
+""")
+
+
+@track_db
+async def hit_rate_limit(
+        db: AsyncSession,
+        key: str,
+        rate: float,
+        burst: float,
+        cost: float = 1
+) -> bool:
+    """Спробувати взяти cost токенів з відра key. Повертає False, якщо ліміт вичерпано"""
+    result = await db.execute(HIT_BUCKET_SQL, {"key": key, "rate": rate, "burst": burst, "cost": cost})
+    allowed = result.scalar()
+    await db.commit()
+    return allowed
+
+
+@track_db
+async def hit_rate_limits(
+        db: AsyncSession,
+        limits: Sequence[Tuple[str, float, float]]
+) -> bool:
+    """
+    Взяти по токену з кожного відра (key, rate, burst), лише якщо токен є в усіх.
+    Рядки блокуються в порядку key, тож паралельні перевірки тих самих відер не взаємоблокуються
+    """
+    limits = sorted(limits)
+    await db.execute(
+        insert(RateLimitBucket)
+        .values([
+            {"key": key, "tokens": burst, "allowed": True, "updated_at": func.now()}
+            for key, _, burst in limits
+        ])
+        .on_conflict_do_nothing(index_elements=[RateLimitBucket.key])
+    )
+    result = await db.execute(
+        select(
+            RateLimitBucket.key,
+            RateLimitBucket.tokens,
+            func.extract("epoch", func.now() - RateLimitBucket.updated_at),
+            func.now()
+        )
+        .where(RateLimitBucket.key.in_([key for key, _, _ in limits]))
+        .order_by(RateLimitBucket.key)
+        .with_for_update()
+    )
+    buckets = {key: (tokens, float(elapsed), now) for key, tokens, elapsed, now in result.all()}
+
+    refilled = {}
+    for key, rate, burst in limits:
+        tokens, elapsed, now = buckets[key]
+        refilled[key] = min(burst, tokens + elapsed * rate)
+    allowed = all(tokens >= 1 for tokens in refilled.values())
+
+    await db.execute(
+        update(RateLimitBucket),
+        [
+            {"key": key, "tokens": tokens - 1 if allowed else tokens, "allowed": allowed, "updated_at": now}
+            for key, tokens in refilled.items()
+        ]
+    )
+    await db.commit()
+    return allowed
+
+
+@track_db
+async def delete_idle_rate_limits(
+        db: AsyncSession,
+        idle_before: datetime
+) -> int:
+    """Видалити відра, які не використовувались з idle_before"""
+    result = await db.execute(
+        delete(RateLimitBucket)
+        .where(RateLimitBucket.updated_at < idle_before)
+        .returning(RateLimitBucket.key)
+    )
+    deleted_count = len(result.all())
+    await db.commit()
+    return deleted_count
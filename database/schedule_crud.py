@@ -1,46 +1,45 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import delete
+from sqlalchemy import delete, insert, update, any_, bindparam, func, Integer
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import selectinload
-from database.models import ScheduleClass, ClassLink, Subject
-from typing import List, Optional
-from datetime import date, time as dt_time
-
-
-async def create_schedule_class(
-        db: AsyncSession,
-        university_group_id: int,
-        subject_id: int,
-        date_obj: date,
-        day_of_week: str,
-        time_start: dt_time,
-        time_end: dt_time,
-        subject_name: str,
-        subject_brief: str = None,
-        class_type: str = None,
-        auditory: str = None,
-        lector: str = None,
-) -> ScheduleClass:
-    """Додати пару в розклад"""
-    schedule = ScheduleClass(
-        university_group_id=university_group_id,
-        subject_id=subject_id,
-        date=date_obj,
-        day_of_week=day_of_week,
-        time_start=time_start,
-        time_end=time_end,
-        subject_name=subject_name,
-        subject_brief=subject_brief,
-        class_type=class_type,
-        auditory=auditory,
-        lector=lector.strip()
-    )
-    db.add(schedule)
-    await db.commit()
-    await db.refresh(schedule)
-    return schedule
-
-
+from database.crud import ChatRow
+from database.link_index import link_index
+from database.models import ScheduleClass, ClassLink, Subject, TelegramChat, UniversityGroup
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from datetime import date, datetime, time as dt_time
+from utils.metrics import track_db
+
+
+class ClassRow(NamedTuple):
+    """Легкий запис пари для планувальника та розсилок"""
+    id: int
+    subject_id: Optional[int]
+    date: date
+    day_of_week: str
+    time_start: dt_time
+    time_end: dt_time
+    subject_name: str
+    class_type: Optional[str]
+    auditory: Optional[str]
+    lector: Optional[str]
+
+
+CLASS_ROW_COLUMNS = (
+    ScheduleClass.id,
+    ScheduleClass.subject_id,
+    ScheduleClass.date,
+    ScheduleClass.day_of_week,
+    ScheduleClass.time_start,
+    ScheduleClass.time_end,
+    ScheduleClass.subject_name,
+    ScheduleClass.class_type,
+    ScheduleClass.auditory,
+    ScheduleClass.lector,
+)
+
+
+@track_db
 async def get_schedule_for_date(
         db: AsyncSession,
         university_group_id: int,
@@ -55,6 +54,7 @@ async def get_schedule_for_date(
     return result.scalars().all()
 
 
+@track_db
 async def get_schedule_for_week(
         db: AsyncSession,
         university_group_id: int,
@@ -73,6 +73,7 @@ async def get_schedule_for_week(
     return result.scalars().all()
 
 
+@track_db
 async def get_class_at_time(
         db: AsyncSession,
         university_group_id: int,
@@ -91,40 +92,116 @@ async def get_class_at_time(
     return result.scalars().first()
 
 
-async def delete_old_schedule(
+@track_db
+async def get_class_rows_by_group_for_date(
+        db: AsyncSession,
+        date_obj: date
+) -> Dict[int, List[ClassRow]]:
+    """Отримати розклад на день для всіх груп одним запитом"""
+    result = await db.execute(
+        select(ScheduleClass.university_group_id, *CLASS_ROW_COLUMNS)
+        .where(ScheduleClass.date == date_obj)
+        .order_by(ScheduleClass.university_group_id, ScheduleClass.time_start)
+    )
+    schedule = {}
+    for group_id, *columns in result.all():
+        schedule.setdefault(group_id, []).append(ClassRow(*columns))
+    return schedule
+
+
+@track_db
+async def get_group_class_rows_between(
         db: AsyncSession,
         university_group_id: int,
-        before_date: date
-) -> bool:
-    """Удалили старий розклад(за часом)"""
-    try:
-        await db.execute(
-            delete(ScheduleClass)
-            .where(ScheduleClass.university_group_id == university_group_id, ScheduleClass.date < before_date)
+        start: datetime,
+        end: datetime
+) -> List[ClassRow]:
+    """Пари групи, що починаються в [start, end); умова по date обмежує пошук потрібними партиціями"""
+    result = await db.execute(
+        select(*CLASS_ROW_COLUMNS)
+        .where(
+            ScheduleClass.university_group_id == university_group_id,
+            ScheduleClass.date.between(start.date(), end.date()),
+            ScheduleClass.starts_at >= start,
+            ScheduleClass.starts_at < end
         )
-        await db.commit()
-        return True
-    except Exception as e:
-        await db.rollback()
-        return False
+    )
+    return [ClassRow(*row) for row in result.all()]
 
 
-async def clear_group_schedule(
+@track_db
+async def get_classes_starting_between(
         db: AsyncSession,
-        university_group_id: int
-) -> bool:
-    """Удалити увесь розклад"""
+        start: datetime,
+        end: datetime
+) -> List[Tuple[ChatRow, ClassRow]]:
+    """
+    Отримати пари, що починаються в інтервалі [start, end), разом з чатами, яким треба надіслати сповіщення.
+    Умова по date обмежує пошук потрібними партиціями, далі працює індекс по starts_at.
+    """
+    result = await db.execute(
+        select(
+            TelegramChat.chat_id,
+            TelegramChat.university_group_id,
+            TelegramChat.admin_user_id,
+            UniversityGroup.name,
+            *CLASS_ROW_COLUMNS
+        )
+        .join(UniversityGroup, UniversityGroup.id == TelegramChat.university_group_id)
+        .join(ScheduleClass, ScheduleClass.university_group_id == TelegramChat.university_group_id)
+        .where(
+            ScheduleClass.date.between(start.date(), end.date()),
+            ScheduleClass.starts_at >= start,
+            ScheduleClass.starts_at < end
+        )
+        .order_by(ScheduleClass.starts_at)
+    )
+    return [(ChatRow(*row[:4]), ClassRow(*row[4:])) for row in result.all()]
+
+
+@track_db
+async def lock_group_schedule(db: AsyncSession, university_group_id: int) -> None:
+    """
+    Транзакційний advisory lock розкладу групи: синхронізації однієї групи (планувальник, фонове
+    оновлення, інша репліка) виконуються по черзі. Знімається на commit/rollback.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(university_group_id)))
+
+
+@track_db
+async def replace_group_schedule_window(
+        db: AsyncSession,
+        university_group_id: int,
+        start: datetime,
+        end: datetime,
+        rows: List[Dict]
+) -> int:
+    """
+    Замінити пари групи, що починаються в [start, end), на rows одним commit:
+    читачі бачать або попередній розклад, або новий, але не порожній чи частковий
+    """
     try:
         await db.execute(
-            delete(ScheduleClass).where(ScheduleClass.university_group_id == university_group_id)
+            delete(ScheduleClass).where(
+                ScheduleClass.university_group_id == university_group_id,
+                ScheduleClass.date.between(start.date(), end.date()),
+                ScheduleClass.starts_at >= start,
+                ScheduleClass.starts_at < end
+            )
         )
+        if rows:
+            await db.execute(
+                insert(ScheduleClass),
+                [dict(row, university_group_id=university_group_id) for row in rows]
+            )
         await db.commit()
-        return True
     except Exception:
         await db.rollback()
-        return False
+        raise
+    return len(rows)
 
 
+@track_db
 async def create_subject_for_group(
         db: AsyncSession,
         group_id: int,
@@ -141,6 +218,7 @@ async def create_subject_for_group(
     return subject
 
 
+@track_db
 async def get_subjects_for_group(
         db: AsyncSession,
         group_id: int
@@ -156,6 +234,7 @@ async def get_subjects_for_group(
     return result.scalars().all()
 
 
+@track_db
 async def get_subject_by_name(
     db: AsyncSession,
     group_id: int,
@@ -175,6 +254,7 @@ async def get_subject_by_name(
     return result.scalars().first()
 
 
+@track_db
 async def get_subject_by_id(
         db: AsyncSession,
         subject_id: int
@@ -184,20 +264,27 @@ async def get_subject_by_id(
     return result.scalars().first()
 
 
+@track_db
 async def delete_subject_by_id(
         db: AsyncSession,
         subject_id: int
 ) -> bool:
-    """Видалити предмет по айді"""
-    subject = await get_subject_by_id(db, subject_id)
-    if subject:
-        await db.delete(subject)
-        await db.commit()
-        return True
-
-    return False
+    """
+    Видалити предмет по айді разом з його парами розкладу. Посилання видаляються каскадно на рівні БД,
+    а schedule_classes.subject_id має ON DELETE SET NULL, тому пари видаляємо явно в тій самій транзакції
+    """
+    await db.execute(delete(ScheduleClass).where(ScheduleClass.subject_id == subject_id))
+    result = await db.execute(
+        delete(Subject).where(Subject.id == subject_id).returning(Subject.id)
+    )
+    deleted = result.scalar() is not None
+    await db.commit()
+    if deleted:
+        link_index.drop_where(subject_ids=[subject_id])
+    return deleted
 
 
+@track_db
 async def create_link_for_subject(
         db: AsyncSession,
         university_group_id: int,
@@ -210,20 +297,25 @@ async def create_link_for_subject(
     """
     Додати посилання
     """
-    link = ClassLink(
-        university_group_id=university_group_id,
-        subject_id=subject_id,
-        owner_user_id=owner_user_id,
-        class_type=class_type,
-        name_link=name_link,
-        meeting_link=meeting_link
+    result = await db.execute(
+        insert(ClassLink)
+        .values(
+            university_group_id=university_group_id,
+            subject_id=subject_id,
+            owner_user_id=owner_user_id,
+            class_type=class_type,
+            name_link=name_link,
+            meeting_link=meeting_link
+        )
+        .returning(ClassLink)
     )
-    db.add(link)
+    link = result.scalars().one()
     await db.commit()
-    await db.refresh(link)
+    link_index.put(link)
     return link
 
 
+@track_db
 async def get_links_for_subject(
         db: AsyncSession,
         university_group_id: int,
@@ -242,6 +334,29 @@ async def get_links_for_subject(
     return result.scalars().all()
 
 
+@track_db
+async def get_links_for_subject_types(
+        db: AsyncSession,
+        university_group_id: int,
+        subject_id: int,
+        class_types: List[str],
+        owner_user_id: int,
+) -> List[ClassLink]:
+    """ Отримати посилання для предмету одразу для кількох типів занять """
+    result = await db.execute(
+        select(ClassLink)
+        .where(
+            ClassLink.university_group_id == university_group_id,
+            ClassLink.subject_id == subject_id,
+            ClassLink.class_type.in_(class_types),
+            ClassLink.owner_user_id == owner_user_id,
+        )
+        .order_by(ClassLink.id)
+    )
+    return result.scalars().all()
+
+
+@track_db
 async def get_links_by_group(
         db: AsyncSession,
         university_group_id: int
@@ -253,6 +368,7 @@ async def get_links_by_group(
     return result.scalars().all()
 
 
+@track_db
 async def get_links_by_owner(
         db: AsyncSession,
         owner_user_id: int,
@@ -272,6 +388,7 @@ async def get_links_by_owner(
     return result.scalars().all()
 
 
+@track_db
 async def get_link_by_id(
         db: AsyncSession,
         link_id: int,
@@ -281,6 +398,7 @@ async def get_link_by_id(
     return result.scalars().first()
 
 
+@track_db
 async def update_link(
         db: AsyncSession,
         link_id: int,
@@ -288,25 +406,96 @@ async def update_link(
         meeting_link: str = None,
 ) -> Optional[ClassLink]:
     """ Обновити посилання """
-    link = await get_link_by_id(db, link_id)
+    values = {}
+    if meeting_link is not None:
+        values["meeting_link"] = meeting_link
+    if name_link is not None:
+        values["name_link"] = name_link
+    if not values:
+        return await get_link_by_id(db, link_id)
+
+    result = await db.execute(
+        update(ClassLink)
+        .where(ClassLink.id == link_id)
+        .values(**values)
+        .returning(ClassLink),
+        execution_options={"populate_existing": True}
+    )
+    link = result.scalars().first()
+    await db.commit()
     if link:
-        if meeting_link is not None:
-            link.meeting_link = meeting_link
-        if name_link is not None:
-            link.name_link = name_link
-        await db.commit()
-        await db.refresh(link)
+        link_index.put(link)
     return link
 
 
+@track_db
 async def delete_link(
         db: AsyncSession,
         link_id: int
-) -> bool:
-    """ Удалити посилання """
-    link = await get_link_by_id(db, link_id)
+) -> Optional[ClassLink]:
+    """ Удалити посилання. Повертає видалене посилання або None """
+    result = await db.execute(
+        delete(ClassLink).where(ClassLink.id == link_id).returning(ClassLink)
+    )
+    link = result.scalars().first()
+    await db.commit()
     if link:
-        await db.delete(link)
-        await db.commit()
-        return True
-    return False
+        link_index.remove(link.id)
+    return link
+
+
+def link_ids_param(link_ids: List[int]):
+    return any_(bindparam("link_ids", [int(link_id) for link_id in link_ids], type_=ARRAY(Integer)))
+
+
+@track_db
+async def update_links(
+        db: AsyncSession,
+        link_ids: List[int],
+        owner_user_id: int,
+        name_link: str = None,
+        meeting_link: str = None,
+) -> List[ClassLink]:
+    """ Оновити кілька посилань адміністратора одним запитом """
+    values = {}
+    if meeting_link is not None:
+        values["meeting_link"] = meeting_link
+    if name_link is not None:
+        values["name_link"] = name_link
+
+    owned_links = (ClassLink.id == link_ids_param(link_ids), ClassLink.owner_user_id == owner_user_id)
+    if not values:
+        result = await db.execute(select(ClassLink).where(*owned_links).order_by(ClassLink.id))
+        return result.scalars().all()
+
+    result = await db.execute(
+        update(ClassLink)
+        .where(*owned_links)
+        .values(**values)
+        .returning(ClassLink),
+        execution_options={"populate_existing": True}
+    )
+    links = result.scalars().all()
+    await db.commit()
+    for link in links:
+        link_index.put(link)
+    return links
+
+
+@track_db
+async def delete_links(
+        db: AsyncSession,
+        link_ids: List[int],
+        owner_user_id: int,
+) -> List[ClassLink]:
+    """ Видалити кілька посилань адміністратора одним запитом. Повертає видалені посилання """
+    result = await db.execute(
+        delete(ClassLink)
+        .where(ClassLink.id == link_ids_param(link_ids), ClassLink.owner_user_id == owner_user_id)
+        .returning(ClassLink)
+    )
+    links = result.scalars().all()
+    await db.commit()
+    for link in links:
+        link_index.remove(link.id)
+    return links
\ No newline at end of file
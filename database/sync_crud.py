@@ -0,0 +1,218 @@
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import ScheduleClass, SyncRun, UniversityGroup
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+from datetime import datetime, timedelta
+from utils.metrics import track_db
+
+SYNC_DURATION_MS = func.extract("epoch", SyncRun.finished_at - SyncRun.started_at) * 1000
+SYNC_CHANGES = SyncRun.rows_inserted + SyncRun.rows_updated + SyncRun.rows_deleted
+
+
+class GroupSyncSummary(NamedTuple):
+    """Підсумок синхронізацій групи за період"""
+    group_id: int
+    group_name: str
+    runs: int
+    failures: int
+    avg_ms: float
+    max_ms: float
+    avg_cist_ms: float
+    avg_payload_bytes: float
+    changes: int
+
+
+@track_db
+async def save_sync_runs(
+        db: AsyncSession,
+        runs: List[Dict[str, Any]]
+) -> None:
+    """Записати пачку записів журналу синхронізацій одним executemany"""
+    await db.execute(insert(SyncRun), runs)
+    await db.commit()
+
+
+@track_db
+async def get_sync_group_summaries(
+        db: AsyncSession,
+        since: datetime,
+        order: str = "duration",
+        limit: int = 10
+) -> List[GroupSyncSummary]:
+    """Групи з найдовшою синхронізацією (order="duration") або з найбільшою кількістю змін (order="changes")"""
+    avg_ms = func.avg(SYNC_DURATION_MS)
+    changes = func.coalesce(func.sum(SYNC_CHANGES), 0)
+    result = await db.execute(
+        select(
+            SyncRun.university_group_id,
+            UniversityGroup.name,
+            func.count(),
+            func.count(SyncRun.error),
+            avg_ms,
+            func.max(SYNC_DURATION_MS),
+            func.avg(SyncRun.cist_ms),
+            func.avg(SyncRun.payload_bytes),
+            changes,
+        )
+        .join(UniversityGroup, UniversityGroup.id == SyncRun.university_group_id)
+        .where(SyncRun.started_at >= since)
+        .group_by(SyncRun.university_group_id, UniversityGroup.name)
+        .order_by((changes if order == "changes" else avg_ms).desc())
+        .limit(limit)
+    )
+    return [
+        GroupSyncSummary(group_id, name, runs, failures, float(avg), float(peak), float(cist), float(payload), int(total))
+        for group_id, name, runs, failures, avg, peak, cist, payload, total in result.all()
+    ]
+
+
+@track_db
+async def get_sync_totals(
+        db: AsyncSession,
+        since: datetime
+) -> Tuple[int, int, int, float]:
+    """Кількість спроб, груп, невдалих спроб і сумарний час запитів до CIST (мс) за період"""
+    result = await db.execute(
+        select(
+            func.count(),
+            func.count(func.distinct(SyncRun.university_group_id)),
+            func.count(SyncRun.error),
+            func.coalesce(func.sum(SyncRun.cist_ms), 0),
+        ).where(SyncRun.started_at >= since)
+    )
+    runs, groups, failures, cist_ms = result.one()
+    return runs, groups, failures, float(cist_ms)
+
+
+@track_db
+async def get_sync_error_counts(
+        db: AsyncSession,
+        since: datetime
+) -> List[Tuple[str, int]]:
+    """Невдалі спроби за класом помилки"""
+    result = await db.execute(
+        select(SyncRun.error, func.count())
+        .where(SyncRun.started_at >= since, SyncRun.error.is_not(None))
+        .group_by(SyncRun.error)
+        .order_by(func.count().desc())
+    )
+    return [(error, count) for error, count in result.all()]
+
+
+@track_db
+async def delete_old_sync_runs(
+        db: AsyncSession,
+        started_before: datetime,
+        limit: int
+) -> int:
+    """Видалити до limit найстаріших записів журналу, старших за started_before"""
+    old_ids = (
+        select(SyncRun.id)
+        .where(SyncRun.started_at < started_before)
+        .order_by(SyncRun.started_at)
+        .limit(limit)
+        .scalar_subquery()
+    )
+    result = await db.execute(delete(SyncRun).where(SyncRun.id.in_(old_ids)).returning(SyncRun.id))
+    deleted_count = len(result.all())
+    await db.commit()
+    return deleted_count
+
+
+@track_db
+async def plan_unscheduled_groups(
+        db: AsyncSession,
+        now: datetime,
+        interval: int
+) -> int:
+    """Групам без плану призначити першу синхронізацію у випадковий момент протягом interval секунд"""
+    result = await db.execute(
+        update(UniversityGroup)
+        .where(UniversityGroup.next_sync_at.is_(None))
+        .values(
+            next_sync_at=now + func.random() * timedelta(seconds=interval),
+            sync_interval=func.coalesce(UniversityGroup.sync_interval, interval),
+        )
+        .returning(UniversityGroup.id)
+    )
+    planned = len(result.all())
+    await db.commit()
+    return planned
+
+
+@track_db
+async def claim_due_groups(
+        db: AsyncSession,
+        now: datetime,
+        lease: timedelta,
+        limit: int
+) -> List[UniversityGroup]:
+    """
+    Взяти групи, час синхронізації яких настав, від найбільш простроченої, і відсунути їх next_sync_at
+    на lease. Інші репліки пропускають заблоковані рядки (SKIP LOCKED) і взяті групи; група,
+    яку не дообробили через збій, повернеться в чергу після lease.
+    """
+    result = await db.execute(
+        select(UniversityGroup)
+        .where(UniversityGroup.next_sync_at <= now)
+        .order_by(UniversityGroup.next_sync_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    groups = list(result.scalars().all())
+    if groups:
+        await db.execute(
+            update(UniversityGroup)
+            .where(UniversityGroup.id.in_([group.id for group in groups]))
+            .values(next_sync_at=now + lease)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    return groups
+
+
+@track_db
+async def release_groups(
+        db: AsyncSession,
+        group_ids: List[int],
+        next_sync_at: datetime
+) -> None:
+    """Повернути взяті, але не синхронізовані групи в чергу"""
+    await db.execute(
+        update(UniversityGroup)
+        .where(UniversityGroup.id.in_(group_ids))
+        .values(next_sync_at=next_sync_at)
+    )
+    await db.commit()
+
+
+@track_db
+async def get_groups_with_classes_between(
+        db: AsyncSession,
+        group_ids: Iterable[int],
+        start: datetime,
+        end: datetime
+) -> Set[int]:
+    """Які з груп мають пари, що починаються в [start, end)"""
+    result = await db.execute(
+        select(ScheduleClass.university_group_id)
+        .where(
+            ScheduleClass.university_group_id.in_(list(group_ids)),
+            ScheduleClass.date >= start.date(),
+            ScheduleClass.date <= end.date(),
+            ScheduleClass.starts_at >= start,
+            ScheduleClass.starts_at < end
+        )
+        .distinct()
+    )
+    return set(result.scalars().all())
+
+
+@track_db
+async def save_group_sync_plans(
+        db: AsyncSession,
+        plans: List[Dict[str, Any]]
+) -> None:
+    """Зберегти план пачкою: [{"id", "next_sync_at", "sync_interval", "sync_failures"}]"""
+    await db.execute(update(UniversityGroup), plans)
+    await db.commit()
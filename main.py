@@ -1,26 +1,36 @@
 import asyncio
 import logging
-import sys
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 from aiogram.types import BotCommand, BotCommandScopeAllGroupChats, BotCommandScopeAllPrivateChats
 
-from config.settings import BOT_TOKEN
-from database.database import init_db, check_connection
-from bot.handlers import admin, common, group
+from config.settings import (
+    BOT_TOKEN, TELEGRAM_API_URL, METRICS_HOST, METRICS_PORT, QUERY_LOG, UPDATE_CAPTURE_FILE, UPDATE_CAPTURE_SALT,
+    LOOP_WATCHDOG
+)
+from database.database import init_db, check_connection, AsyncSessionLocal
+from database.link_index import link_index
+from bot.handlers import admin, common, group, operator
 from bot.middlewares.anti_spam import AntiSpamMiddleware
+from bot.middlewares.metrics import HandlerMetricsMiddleware, TelegramMetricsMiddleware, UpdateStatsMiddleware
+from bot.middlewares.outbound import OutboundPriorityMiddleware, ChatReaperMiddleware
+from bot.middlewares.query_count import QueryCountMiddleware
+from bot.middlewares.tracing import TracingMiddleware, TelegramTracingMiddleware
+from bot.middlewares.update_capture import UpdateCaptureMiddleware, build_capture_writer
+from bot.middlewares.rate_limiter import build_rate_limiter_backend
+from bot.storage.postgres_storage import build_fsm_storage
 from services.scheduler import start_scheduler, stop_scheduler
+from services.sync_journal import sync_journal
+from services.metrics_server import start_metrics_server
+from services.outbound import outbound
+from services.chat_reaper import chat_reaper
+from utils.logger import setup_logging
+from utils.tracing import tracer
+from utils.watchdog import watchdog
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    encoding='utf-8',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('bot.log')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +55,45 @@ group_commands = [
 ]
 
 
+def instrument_bot(bot: Bot):
+    """Middleware сесії: смуги пріоритету, прибирання недоступних чатів, метрики і спани запитів до Bot API"""
+    # Перший зареєстрований — зовнішній: час у черзі смуги не потрапляє в метрики запиту,
+    # а повтор після міграції чату знову проходить через ліміт
+    bot.session.middleware(ChatReaperMiddleware(chat_reaper))
+    if outbound.enabled:
+        bot.session.middleware(OutboundPriorityMiddleware(outbound))
+    bot.session.middleware(TelegramMetricsMiddleware())
+    if tracer.enabled:
+        bot.session.middleware(TelegramTracingMiddleware())
+
+
+def create_dispatcher() -> Dispatcher:
+    """Dispatcher з усіма роутерами і middleware; його ж використовує benchmarks/replay.py"""
+    dp = Dispatcher(storage=build_fsm_storage())
+
+    for router in (operator.router, common.router, group.router, admin.router):
+        router.message.middleware(HandlerMetricsMiddleware())
+        router.callback_query.middleware(HandlerMetricsMiddleware())
+        router.my_chat_member.middleware(HandlerMetricsMiddleware())
+        dp.include_router(router)
+
+    dp.update.outer_middleware(UpdateStatsMiddleware())
+    if UPDATE_CAPTURE_FILE:
+        capture_writer = build_capture_writer(UPDATE_CAPTURE_FILE, UPDATE_CAPTURE_SALT)
+        dp.update.outer_middleware(UpdateCaptureMiddleware(capture_writer))
+        dp.shutdown.register(capture_writer.flush)
+    if tracer.enabled:
+        dp.update.outer_middleware(TracingMiddleware())
+    if QUERY_LOG:
+        dp.update.outer_middleware(QueryCountMiddleware())
+
+    rate_limiter = build_rate_limiter_backend()
+    dp.message.middleware(AntiSpamMiddleware(rate_limiter, kind="message", user_rate=1 / 3, user_burst=1))
+    # Перемикання чекбоксів у /setting_links — часті, але теж обмежені
+    dp.callback_query.middleware(AntiSpamMiddleware(rate_limiter, kind="callback", user_rate=2, user_burst=5))
+    return dp
+
+
 async def main():
     logger.info("Запуск бота...")
 
@@ -58,17 +107,30 @@ async def main():
         logger.error(f"Помилка ініціалізації бази даних: {e}")
         return
 
+    try:
+        async with AsyncSessionLocal() as db:
+            await link_index.warm(db)
+    except Exception as e:
+        logger.error(f"Не вдалося прогріти індекс посилань, сповіщення читатимуть посилання з БД: {e}")
+
+    session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)) if TELEGRAM_API_URL else None
     bot = Bot(
         token=BOT_TOKEN,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher()
+    instrument_bot(bot)
+    dp = create_dispatcher()
 
-    dp.include_router(common.router)
-    dp.include_router(group.router)
-    dp.include_router(admin.router)
+    metrics_runner = None
+    if METRICS_PORT:
+        try:
+            metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        except OSError as e:
+            logger.error(f"Не вдалося запустити сервер метрик: {e}")
 
-    dp.message.middleware(AntiSpamMiddleware(delay=3))
+    if LOOP_WATCHDOG:
+        watchdog.start()
 
     start_scheduler(bot)
 
@@ -82,12 +144,22 @@ async def main():
         logger.error(f"Помилка під час запуску бота: {e}")
     finally:
         stop_scheduler()
+        watchdog.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        await sync_journal.close()
+        await chat_reaper.close()
+        await dp.storage.close()
         await bot.session.close()
+        tracer.shutdown()
         logger.info("Бот зупинений")
 
 
 if __name__ == "__main__":
+    log_listener = setup_logging()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        logger.info("Бот зупинений користувачем")
\ No newline at end of file
+        logger.info("Бот зупинений користувачем")
+    finally:
+        log_listener.stop()
\ No newline at end of file
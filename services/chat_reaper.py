@@ -0,0 +1,99 @@
+"""
+Прибирання недоступних одержувачів.
+
+Якщо Telegram відповідає на відправку, що бота заблоковано, видалено з групи, користувача деактивовано
+чи "chat not found", одержувач більше не отримає жодного повідомлення. Інші відмови (зокрема "bot can't
+initiate conversation" — користувач ще не натиснув /start) чат не видаляють. ChatReaperMiddleware
+(bot/middlewares/outbound.py) повідомляє про такі чати сюди, а reaper у фоні видаляє їх пачкою:
+від'ємний chat_id — реєстрація групи (підписники каскадно), додатний — усі особисті підписки
+користувача. Групу, перетворену на супергрупу, переносять на новий chat_id.
+"""
+from typing import Set
+import asyncio
+import logging
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from database.crud import (
+    delete_telegram_chats_by_chat_ids, delete_private_subscriptions_by_users, migrate_telegram_chat_id
+)
+from database.database import AsyncSessionLocal
+from utils.metrics import chats_reaped
+
+logger = logging.getLogger(__name__)
+
+# Збираємо помилки цей час, щоб видалити одним запитом (розсилка дає їх десятками поспіль)
+FLUSH_DELAY = 5.0
+
+# Відмови Telegram, після яких одержувач гарантовано недоступний
+DEAD_CHAT_MESSAGES = (
+    "bot was blocked by the user",
+    "user is deactivated",
+    "bot was kicked",
+    "chat not found",
+)
+
+
+def is_dead_chat_error(error: Exception) -> bool:
+    if not isinstance(error, (TelegramForbiddenError, TelegramBadRequest)):
+        return False
+    message = error.message.lower()
+    return any(dead in message for dead in DEAD_CHAT_MESSAGES)
+
+
+async def migrate_chat(old_chat_id: int, new_chat_id: int):
+    """Перенести реєстрацію групи на id супергрупи"""
+    try:
+        async with AsyncSessionLocal() as db:
+            migrated = await migrate_telegram_chat_id(db, old_chat_id, new_chat_id)
+    except Exception as e:
+        logger.error(f"Не вдалося перенести чат {old_chat_id} на супергрупу {new_chat_id}: {e}")
+        return
+    if migrated:
+        chats_reaped.inc(kind="migrated")
+        logger.info(f"Чат {old_chat_id} перетворено на супергрупу, реєстрацію перенесено на {new_chat_id}")
+
+
+class ChatReaper:
+    def __init__(self, flush_delay: float = FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self.pending: Set[int] = set()
+        self._flush_task = None
+
+    def report_dead(self, chat_id: int, reason: str):
+        if chat_id in self.pending:
+            return
+        logger.info(f"Чат {chat_id} недоступний ({reason}), буде видалено з розсилок")
+        self.pending.add(chat_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+
+    async def flush(self):
+        chat_ids, self.pending = self.pending, set()
+        if not chat_ids:
+            return
+        groups = [chat_id for chat_id in chat_ids if chat_id < 0]
+        users = [chat_id for chat_id in chat_ids if chat_id > 0]
+        try:
+            async with AsyncSessionLocal() as db:
+                deleted_chats = await delete_telegram_chats_by_chat_ids(db, groups) if groups else 0
+                deleted_subscriptions = await delete_private_subscriptions_by_users(db, users) if users else 0
+        except Exception as e:
+            logger.error(f"Не вдалося видалити недоступні чати ({len(chat_ids)}): {e}")
+            return
+        chats_reaped.inc(deleted_chats, kind="group")
+        chats_reaped.inc(deleted_subscriptions, kind="private")
+        if deleted_chats or deleted_subscriptions:
+            logger.info(f"Видалено недоступних груп: {deleted_chats}, особистих підписок: {deleted_subscriptions}")
+
+    async def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+
+chat_reaper = ChatReaper()
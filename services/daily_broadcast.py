@@ -0,0 +1,190 @@
+"""
+Щоденна розсилка розкладу у два етапи.
+
+prepare — за DAILY_PREPARE_MINUTES хвилин до розсилки трьома запитами читає чати, розклад на день
+і приватних підписників та готує всі тексти: список (чат, текст, вид) лежить у памʼяті.
+dispatch — о DAILY_SCHEDULE_TIME надсилає список рівномірно з найбільшим темпом, який дозволяють
+ліміти Telegram (BROADCAST_MAX_RATE і частка масових смуг services/outbound.py), тож розклад
+приходить якомога раніше. Кілька відправок можуть іти паралельно, тож затримка Bot API
+не розтягує розсилку. TelegramRetryAfter ставить на паузу весь темп.
+Дедлайн (DAILY_DEADLINE_MINUTES після початку) лише контролюється: якщо на цьому темпі розсилка
+не вкладається, це видно в лозі заздалегідь, а наприкінці логується і пишеться в метрику,
+наскільки раніше чи пізніше дедлайну завершено.
+"""
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+from config.settings import BROADCAST_MAX_RATE, BROADCAST_CONCURRENCY
+from database.crud import get_all_chat_rows, get_private_subscriber_ids_by_chats
+from database.database import AsyncSessionLocal
+from database.schedule_crud import get_class_rows_by_group_for_date
+from services.message_sender import render_daily_schedule, render_private_copy
+from services.outbound import outbound, send_lane
+from utils.metrics import notifications, daily_broadcast_margin
+from utils.stats import stats
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 3
+
+
+class BroadcastItem(NamedTuple):
+    chat_id: int
+    text: str
+    kind: str  # daily — в групу, private — копія підписнику
+
+
+class PreparedBroadcast(NamedTuple):
+    date: date
+    items: List[BroadcastItem]
+
+
+async def prepare_daily_broadcast(date_obj: date) -> PreparedBroadcast:
+    """Підготувати всі повідомлення щоденної розсилки"""
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        chats = await get_all_chat_rows(db)
+        schedules = await get_class_rows_by_group_for_date(db, date_obj)
+        subscribers = await get_private_subscriber_ids_by_chats(db)
+
+    items = []
+    for chat in chats:
+        schedule = schedules.get(chat.university_group_id, [])
+        text = render_daily_schedule(chat, date_obj, schedule)
+        items.append(BroadcastItem(chat.chat_id, text, "daily"))
+        # Без пар підписникам нічого не надсилаємо
+        if schedule:
+            private_text = render_private_copy(chat.group_name, text)
+            items.extend(BroadcastItem(user_id, private_text, "private") for user_id in subscribers.get(chat.chat_id, []))
+
+    logger.info(
+        f"Щоденну розсилку на {date_obj.strftime('%d.%m.%Y')} підготовлено за {time.perf_counter() - started:.2f} с: "
+        f"{len(chats)} чатів, {len(items)} повідомлень"
+    )
+    return PreparedBroadcast(date_obj, items)
+
+
+class PacedSender:
+    """Відправка списку з рівномірним темпом і спільною паузою при TelegramRetryAfter"""
+
+    def __init__(self, bot: Bot, rate: float, concurrency: int):
+        self.bot = bot
+        self.interval = 1 / rate
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.paused_until = 0.0
+        self.sent = 0
+        self.failed = 0
+
+    async def _wait_pause(self) -> bool:
+        loop = asyncio.get_running_loop()
+        paused = False
+        while loop.time() < self.paused_until:
+            paused = True
+            await asyncio.sleep(self.paused_until - loop.time())
+        return paused
+
+    async def _send(self, item: BroadcastItem):
+        async with self.semaphore:
+            for _ in range(MAX_RETRIES + 1):
+                await self._wait_pause()
+                try:
+                    with send_lane(item.kind):
+                        await self.bot.send_message(
+                            chat_id=item.chat_id, text=item.text, parse_mode="HTML", disable_web_page_preview=True
+                        )
+                    self.sent += 1
+                    notifications.inc(kind=item.kind, status="sent")
+                    return
+                except TelegramRetryAfter as e:
+                    loop = asyncio.get_running_loop()
+                    self.paused_until = max(self.paused_until, loop.time() + e.retry_after)
+                    logger.warning(f"Telegram просить зачекати {e.retry_after} с, розсилку призупинено")
+                except Exception as e:
+                    logger.warning(f"Не вдалося надіслати щоденний розклад у {item.chat_id}: {e}")
+                    break
+            self.failed += 1
+            notifications.inc(kind=item.kind, status="failed")
+
+    async def run(self, items: List[BroadcastItem]):
+        loop = asyncio.get_running_loop()
+        tasks = []
+        next_at = loop.time()
+        for index, item in enumerate(items):
+            if await self._wait_pause():
+                # Після паузи продовжуємо з тим самим темпом, а не надолужуємо пропущене
+                next_at = loop.time()
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            stats.set_backlog("daily", len(items) - index)
+            tasks.append(asyncio.create_task(self._send(item)))
+            next_at += self.interval
+        await asyncio.gather(*tasks)
+        stats.set_backlog("daily", 0)
+
+
+def max_broadcast_rate() -> float:
+    """BROADCAST_MAX_RATE, але не більше частки ліміту, доступної масовим смугам (services/outbound.py)"""
+    if outbound.enabled:
+        return min(BROADCAST_MAX_RATE, outbound.bulk.rate)
+    return BROADCAST_MAX_RATE
+
+
+async def dispatch_daily_broadcast(bot: Bot, prepared: PreparedBroadcast, deadline: datetime) -> dict:
+    """Надіслати підготовлену розсилку з найбільшим дозволеним темпом; повертає звіт із запасом до deadline"""
+    now = datetime.now(deadline.tzinfo)
+    rate = max_broadcast_rate()
+    projected = now + timedelta(seconds=len(prepared.items) / rate)
+    if projected > deadline:
+        logger.warning(
+            f"Щоденна розсилка не вкладається в дедлайн навіть на {rate:.0f} повідомлень/с: "
+            f"очікуване завершення {projected.strftime('%H:%M:%S')}, дедлайн {deadline.strftime('%H:%M:%S')}"
+        )
+
+    sender = PacedSender(bot, rate, BROADCAST_CONCURRENCY)
+    started = time.perf_counter()
+    await sender.run(prepared.items)
+    finished = datetime.now(deadline.tzinfo)
+
+    margin = (deadline - finished).total_seconds()
+    daily_broadcast_margin.set(margin)
+    report = {
+        "messages": len(prepared.items),
+        "sent": sender.sent,
+        "failed": sender.failed,
+        "rate": rate,
+        "duration": time.perf_counter() - started,
+        "margin": margin,
+    }
+    logger.info(
+        f"Щоденну розсилку завершено за {report['duration']:.1f} с ({rate:.1f} повідомлень/с): "
+        f"надіслано {sender.sent}, помилок {sender.failed}, "
+        + (f"на {margin:.0f} с раніше дедлайну" if margin >= 0 else f"на {-margin:.0f} с ПІЗНІШЕ дедлайну")
+    )
+    return report
+
+
+class DailyBroadcast:
+    """Підготовлена розсилка між етапами prepare і dispatch"""
+
+    def __init__(self):
+        self.prepared: Optional[PreparedBroadcast] = None
+
+    async def prepare(self, date_obj: date):
+        self.prepared = await prepare_daily_broadcast(date_obj)
+
+    async def dispatch(self, bot: Bot, date_obj: date, deadline: datetime) -> dict:
+        prepared, self.prepared = self.prepared, None
+        if prepared is None or prepared.date != date_obj:
+            logger.warning("Розсилку не було підготовлено заздалегідь, готуємо зараз")
+            prepared = await prepare_daily_broadcast(date_obj)
+        return await dispatch_daily_broadcast(bot, prepared, deadline)
+
+
+daily_broadcast = DailyBroadcast()
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import time
+
+from config.settings import MAINTENANCE_BATCH_SIZE, RATE_LIMIT_IDLE_TTL, SYNC_RUNS_RETENTION_DAYS
+from database.crud import delete_unused_university_groups_batch
+from database.rate_limit_crud import delete_idle_rate_limits
+from database.sync_crud import delete_old_sync_runs
+from database.database import AsyncSessionLocal, async_engine
+from database.models import KYIV_TZ
+from database.partitions import ensure_schedule_partitions, drop_expired_schedule_partitions
+
+logger = logging.getLogger(__name__)
+
+# Групи без чатів молодші за цей інтервал не видаляємо, щоб не зачепити /register, що ще триває
+UNUSED_GROUP_GRACE_PERIOD = timedelta(hours=1)
+
+
+async def rotate_schedule_partitions(today) -> dict:
+    """Створити партиції розкладу наперед і видалити партиції за минулі місяці"""
+    async with async_engine.begin() as conn:
+        created = await ensure_schedule_partitions(conn, today)
+        dropped = await drop_expired_schedule_partitions(conn, today)
+    return {"created": created, "dropped": dropped}
+
+
+async def delete_unused_university_groups() -> int:
+    """Видалити університетські групи без чатів порціями"""
+    created_before = datetime.utcnow() - UNUSED_GROUP_GRACE_PERIOD
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            deleted = len(await delete_unused_university_groups_batch(db, created_before, MAINTENANCE_BATCH_SIZE))
+        total += deleted
+        if deleted < MAINTENANCE_BATCH_SIZE:
+            return total
+        await asyncio.sleep(0)
+
+
+async def delete_idle_rate_limit_buckets() -> int:
+    """Видалити відра rate limiter, які давно не використовувались"""
+    idle_before = datetime.now(KYIV_TZ) - timedelta(seconds=RATE_LIMIT_IDLE_TTL)
+    async with AsyncSessionLocal() as db:
+        return await delete_idle_rate_limits(db, idle_before)
+
+
+async def delete_expired_sync_runs() -> int:
+    """Видалити записи журналу синхронізацій, старші за SYNC_RUNS_RETENTION_DAYS, порціями"""
+    started_before = datetime.now(KYIV_TZ) - timedelta(days=SYNC_RUNS_RETENTION_DAYS)
+    total = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            deleted = await delete_old_sync_runs(db, started_before, MAINTENANCE_BATCH_SIZE)
+        total += deleted
+        if deleted < MAINTENANCE_BATCH_SIZE:
+            return total
+        await asyncio.sleep(0)
+
+
+async def run_maintenance() -> dict:
+    """Щоденне обслуговування БД: ротація партицій розкладу і видалення груп без чатів"""
+    started = time.monotonic()
+    report = {"created_partitions": [], "dropped_partitions": [], "unused_groups": 0, "idle_rate_limits": 0,
+              "old_sync_runs": 0}
+
+    try:
+        partitions = await rotate_schedule_partitions(datetime.now(KYIV_TZ).date())
+        report["created_partitions"] = partitions["created"]
+        report["dropped_partitions"] = partitions["dropped"]
+        report["unused_groups"] = await delete_unused_university_groups()
+        report["idle_rate_limits"] = await delete_idle_rate_limit_buckets()
+        report["old_sync_runs"] = await delete_expired_sync_runs()
+    except Exception as e:
+        logger.error(f"Помилка під час обслуговування БД: {e}", exc_info=True)
+
+    logger.info(
+        f"Обслуговування БД завершено за {time.monotonic() - started:.1f} с: "
+        f"створено партицій {len(report['created_partitions'])}, "
+        f"видалено партицій {len(report['dropped_partitions'])}, "
+        f"груп без чатів {report['unused_groups']}, "
+        f"неактивних лімітів {report['idle_rate_limits']}, "
+        f"старих записів журналу синхронізацій {report['old_sync_runs']}"
+    )
+    return report
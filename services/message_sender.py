@@ -2,33 +2,41 @@ from aiogram import Bot
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from bot.handlers.group import format_schedule_message
-from database.crud import get_private_subscribers_by_chat
+from database.crud import ChatRow, get_private_subscriber_ids_by_chat
 from database.database import AsyncSessionLocal
-from database.schedule_crud import (
-    get_schedule_for_date,
-    get_links_for_subject
-)
-from database.models import TelegramChat, ScheduleClass
+from database.schedule_crud import ClassRow, get_links_for_subject
+from database.link_index import link_index, render_link_line
+from services.outbound import send_lane
+from utils.metrics import notifications
 from datetime import date
+from typing import List
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-async def send_class_notification(bot: Bot, chat: TelegramChat, schedule_class: ScheduleClass):
+async def send_class_notification(bot: Bot, chat: ChatRow, schedule_class: ClassRow):
     """
     Надіслати сповіщення про початок пари.
     """
     async with AsyncSessionLocal() as db:
         try:
             logger.info(f"{int(chat.university_group_id)}, {int(schedule_class.id)}, {schedule_class.class_type}")
-            links = await get_links_for_subject(
-                db,
-                int(chat.university_group_id),
-                int(schedule_class.subject_id),
+            link_lines = link_index.get_lines(
+                chat.university_group_id,
+                schedule_class.subject_id,
                 schedule_class.class_type,
                 chat.admin_user_id
             )
+            if link_lines is None:
+                links = await get_links_for_subject(
+                    db,
+                    int(chat.university_group_id),
+                    int(schedule_class.subject_id),
+                    schedule_class.class_type,
+                    chat.admin_user_id
+                )
+                link_lines = [render_link_line(link) for link in links]
 
             message = f"🔔 <b>Пара розпочалася!</b>\n\n"
             message += f"📚 <b>{schedule_class.subject_name}</b>\n"
@@ -43,75 +51,68 @@ async def send_class_notification(bot: Bot, chat: TelegramChat, schedule_class:
 
             message += "\n"
 
-            if links:
+            if link_lines:
                 message += "<b>Посилання:</b>\n"
-                for link in links:
-                    message += f"🎥 <a href='{link.meeting_link}'>{link.name_link} ({link.class_type})</a>\n"
+                for line in link_lines:
+                    message += f"{line}\n"
             else:
                 message += "ℹ️ <i>Посилання ще не додані адміністратором</i>"
 
-            sent_message = await bot.send_message(
-                chat_id=chat.chat_id,
-                text=message,
-                parse_mode="HTML",
-                disable_web_page_preview=True
-            )
+            with send_lane("class_start"):
+                sent_message = await bot.send_message(
+                    chat_id=chat.chat_id,
+                    text=message,
+                    parse_mode="HTML",
+                    disable_web_page_preview=True
+                )
 
-            logger.info(f"Сповіщення надіслано в групу {chat.university_group.name}")
+            notifications.inc(kind="class_start", status="sent")
+            logger.info(f"Сповіщення надіслано в групу {chat.group_name}")
 
-            await send_to_private_subscriber(bot, db, chat.chat_id, chat.university_group.name, message)
+            await send_to_private_subscriber(bot, db, chat.chat_id, chat.group_name, message)
 
         except Exception as e:
+            notifications.inc(kind="class_start", status="failed")
             logger.error(f"Помилка під час надсилання сповіщення: {e}")
 
 
-async def send_daily_schedule(bot: Bot, chat: TelegramChat, date_obj: date):
-    """
-    Надіслати розклад на день о 7:45.
-    """
-    async with AsyncSessionLocal() as db:
-        logger.info(f"Щоденне {chat.chat_id}")
-        try:
-            schedule = await get_schedule_for_date(db, chat.university_group_id, date_obj)
+def render_daily_schedule(chat: ChatRow, date_obj: date, schedule: List[ClassRow]) -> str:
+    """Текст щоденного розкладу для чату"""
+    if not schedule:
+        return (
+            f"📅 <b>Розклад на {date_obj.strftime('%d.%m.%Y')}</b>\n\n"
+            f"🎉 Сьогодні пар немає!"
+        )
 
-            if not schedule:
-                message = (
-                    f"📅 <b>Розклад на {date_obj.strftime('%d.%m.%Y')}</b>\n\n"
-                    f"🎉 Сьогодні пар немає!"
-                )
-                await bot.send_message(chat_id=chat.chat_id, text=message, parse_mode="HTML")
-                return
+    formatted_schedule = format_schedule_message(
+        group_name=chat.group_name,
+        schedule=schedule,
+        is_week=False
+    )
+    formatted_schedule += "\n💡 <i>Посилання будуть надіслані на початку кожної пари</i>"
+    return formatted_schedule
 
-            formatted_schedule = format_schedule_message(
-                group_name=chat.university_group.name,
-                schedule=schedule,
-                is_week=False
-            )
-
-            formatted_schedule += "\n💡 <i>Посилання будуть надіслані на початку кожної пари</i>"
 
-            await bot.send_message(chat_id=chat.chat_id, text=formatted_schedule, parse_mode="HTML")
-            logger.info(f"Щоденний розклад надіслано в групу {chat.university_group.name}")
-
-            await send_to_private_subscriber(bot, db, chat.chat_id, chat.university_group.name, formatted_schedule)
-
-        except Exception as e:
-            logger.error(f"Помилка під час надсилання щоденного розкладу: {e}", exc_info=True)
+def render_private_copy(group_name: str, text: str) -> str:
+    return f"Сповіщення з групи {group_name}:\n\n" + text
 
 
 async def send_to_private_subscriber(bot: Bot, db: AsyncSession, chat_id: int, group_name: str, text: str):
     """
     Надіслати повідомлення користувачам, підписаним на особисті сповіщення.
     """
-    subscribers = await get_private_subscribers_by_chat(db, int(chat_id))
-    text_private = f"Сповіщення з групи {group_name}:\n\n" + text
+    subscribers = await get_private_subscriber_ids_by_chat(db, int(chat_id))
+    text_private = render_private_copy(group_name, text)
     for user_id in subscribers:
         try:
-            await bot.send_message(
-                chat_id=user_id.user_id,
-                text=text_private,
-                parse_mode="HTML",
-                disable_web_page_preview=True
-            )
+            with send_lane("private"):
+                await bot.send_message(
+                    chat_id=user_id,
+                    text=text_private,
+                    parse_mode="HTML",
+                    disable_web_page_preview=True
+                )
+            notifications.inc(kind="private", status="sent")
         except Exception as e:
+            notifications.inc(kind="private", status="failed")
             logger.warning(f"Не вдалося надіслати повідомлення користувачу {user_id}: {e}")
@@ -0,0 +1,145 @@
+"""
+Пріоритетні смуги вихідних повідомлень.
+
+Усі відправки й редагування повідомлень проходять через OutboundScheduler (middleware сесії бота,
+bot/middlewares/outbound.py) і чекають токен загального ліміту OUTBOUND_RATE повідомлень/с.
+Смуга визначається контекстом відправки (send_lane), за замовчуванням — interactive.
+Порядок видачі токенів: interactive > class_start > daily > private. Масові смуги додатково
+обмежені часткою 1 - OUTBOUND_INTERACTIVE_RESERVE ліміту, тож відповіді користувачам
+мають гарантований запас навіть посеред розсилки.
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+import asyncio
+import time
+
+from config.settings import OUTBOUND_RATE, OUTBOUND_INTERACTIVE_RESERVE
+from utils.metrics import outbound_queue_depth, outbound_queue_wait
+
+LANES = ("interactive", "class_start", "daily", "private")
+INTERACTIVE = "interactive"
+
+_current_lane: ContextVar[str] = ContextVar("send_lane", default=INTERACTIVE)
+
+
+@contextmanager
+def send_lane(lane: str):
+    """Відправки всередині блоку (і в створених у ньому задачах) йдуть у смугу lane"""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def current_lane() -> str:
+    return _current_lane.get()
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        # Відро без поповнення не обмежує, як і OUTBOUND_RATE=0
+        if self.rate <= 0:
+            return 0.0
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class OutboundScheduler:
+    def __init__(self, rate: float = OUTBOUND_RATE, interactive_reserve: float = OUTBOUND_INTERACTIVE_RESERVE):
+        if not 0 <= interactive_reserve < 1:
+            raise ValueError("interactive_reserve має бути в межах [0, 1)")
+        self.rate = rate
+        # Запас на секунду: короткий сплеск проходить без черги
+        self.total = TokenBucket(rate, rate)
+        bulk_rate = rate * (1 - interactive_reserve)
+        self.bulk = TokenBucket(bulk_rate, bulk_rate)
+        self.queues: Dict[str, Deque[asyncio.Future]] = {lane: deque() for lane in LANES}
+        self._pump_task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def depth(self, lane: str) -> int:
+        return len(self.queues[lane])
+
+    async def acquire(self, lane: str):
+        """Дочекатися дозволу на одну відправку в смузі lane"""
+        if lane not in self.queues:
+            lane = INTERACTIVE
+        if not any(self.queues.values()) and self._try_grant(lane, time.monotonic()):
+            outbound_queue_wait.observe(0, lane=lane)
+            return
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        self.queues[lane].append(future)
+        outbound_queue_depth.set(len(self.queues[lane]), lane=lane)
+        self._wakeup.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+        try:
+            await future
+        finally:
+            outbound_queue_wait.observe(time.monotonic() - started, lane=lane)
+
+    def _try_grant(self, lane: str, now: float) -> bool:
+        self.total.refill(now)
+        self.bulk.refill(now)
+        if self.total.tokens < 1:
+            return False
+        if lane != INTERACTIVE:
+            if self.bulk.tokens < 1:
+                return False
+            self.bulk.tokens -= 1
+        self.total.tokens -= 1
+        return True
+
+    def _next_waiter(self) -> Optional[str]:
+        """Смуга з найвищим пріоритетом, у черзі якої хтось чекає"""
+        for lane in LANES:
+            queue = self.queues[lane]
+            # Скасовані очікування прибираємо без витрати токена
+            while queue and queue[0].done():
+                queue.popleft()
+            if queue:
+                return lane
+            outbound_queue_depth.set(0, lane=lane)
+        return None
+
+    async def _pump(self):
+        while True:
+            lane = self._next_waiter()
+            if lane is None:
+                return
+            if self._try_grant(lane, time.monotonic()):
+                queue = self.queues[lane]
+                queue.popleft().set_result(None)
+                outbound_queue_depth.set(len(queue), lane=lane)
+                continue
+
+            delay = self.total.wait_time()
+            if lane != INTERACTIVE:
+                delay = max(delay, self.bulk.wait_time())
+            # Нова відправка з вищим пріоритетом будить pump раніше
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(delay, 0.001))
+            except asyncio.TimeoutError:
+                pass
+
+
+outbound = OutboundScheduler()
@@ -1,24 +1,121 @@
 import logging
 import aiohttp
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
-from config.settings import TIMEZONE, SCHEDULE_API_URL
+from config.settings import TIMEZONE, SCHEDULE_API_URL, SYNC_CIST_BUDGET_PER_HOUR, RATE_LIMIT_BACKEND
+from database.database import AsyncSessionLocal
+from database.rate_limit_crud import hit_rate_limit
+from utils.metrics import timed, cist_duration
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 
+class CistUsage:
+    """Запити до CIST в межах track_cist_usage: кількість, сумарний час, розмір відповідей"""
+    __slots__ = ("requests", "seconds", "payload_bytes")
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.payload_bytes = 0
+
+
+_current_usage: ContextVar[Optional[CistUsage]] = ContextVar("cist_usage", default=None)
+
+
+class RequestBudget:
+    """
+    Бюджет запитів до CIST для фонових синхронізацій на годину (token bucket із запасом на burst секунд).
+    Синхронізація групи забирає свої запити наперед через acquire. shared=True — відро в таблиці
+    rate_limit_buckets, один бюджет на всі репліки бота.
+    """
+
+    KEY = "cist_budget"
+
+    def __init__(self, per_hour: float, burst: float = 600, shared: bool = False):
+        self.rate = per_hour / 3600
+        self.capacity = max(self.rate * burst, 1.0)
+        self.shared = shared
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return self.tokens
+
+    async def acquire(self, amount: float) -> bool:
+        """Забрати amount запитів з бюджету; False — бюджет вичерпано"""
+        if self.shared:
+            try:
+                async with AsyncSessionLocal() as db:
+                    return await hit_rate_limit(db, self.KEY, self.rate, self.capacity, amount)
+            except Exception as e:
+                logger.warning(f"Не вдалося перевірити бюджет запитів до CIST: {e}")
+                return False
+        if self.available() < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+
+cist_budget = RequestBudget(SYNC_CIST_BUDGET_PER_HOUR, shared=RATE_LIMIT_BACKEND == "postgres")
+
+
+@contextmanager
+def track_cist_usage():
+    usage = CistUsage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+def metered(func):
+    """Додати запит і його час до поточного CistUsage"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            usage = _current_usage.get()
+            if usage is not None:
+                usage.requests += 1
+                usage.seconds += time.perf_counter() - started
+    return wrapper
+
+
+async def read_json(response: aiohttp.ClientResponse) -> Dict:
+    body = await response.read()
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.payload_bytes += len(body)
+    return await response.json()
+
+
 class ScheduleAPI:
     def __init__(self):
         self.kyiv_tz = ZoneInfo(TIMEZONE)
 
+    @timed(cist_duration, endpoint="groups")
+    @traced("cist.groups")
+    @metered
     async def fetch_groups(self, session: aiohttp.ClientSession) -> Optional[Dict]:
         url = f"{SCHEDULE_API_URL}/groups"
         try:
             async with session.get(url, timeout=10) as response:
                 if response.status == 200:
                     logger.info("Групи отримано")
-                    return await response.json()
+                    return await read_json(response)
                 logger.error(f"Помилка API ({response.status}) під час отримання груп")
         except Exception as e:
             logger.error(f"Помилка під час запиту до груп: {e}")
@@ -63,12 +160,15 @@ class ScheduleAPI:
 
             return found_group.get("id") if found_group else None
 
+    @timed(cist_duration, endpoint="subjects")
+    @traced("cist.subjects")
+    @metered
     async def fetch_subjects(self, session: aiohttp.ClientSession, group_id: int) -> Optional[Dict]:
         url = f"{SCHEDULE_API_URL}/groups/{group_id}/subjects"
         try:
             async with session.get(url, timeout=10) as response:
                 if response.status == 200:
-                    return await response.json()
+                    return await read_json(response)
                 logger.error(f"Помилка API ({response.status}) під час отримання предметів для group_id={group_id}")
         except Exception as e:
             logger.error(f"Помилка під час запиту предметів для group_id={group_id}: {e}")
@@ -96,13 +196,16 @@ class ScheduleAPI:
 
         return parsed
 
+    @timed(cist_duration, endpoint="schedule")
+    @traced("cist.schedule")
+    @metered
     async def fetch_schedule_for_week(self, session: aiohttp.ClientSession, group_id: int,
                                       start_time: int, end_time: int) -> Optional[Dict]:
         url = f"{SCHEDULE_API_URL}/groups/{group_id}/schedule?startedAt={start_time}&endedAt={end_time}"
         try:
             async with session.get(url, timeout=10) as response:
                 if response.status == 200:
-                    return await response.json()
+                    return await read_json(response)
                 logger.error(f"Помилка API: {response.status}")
         except Exception as e:
             logger.error(f"Помилка під час запиту розкладу: {e}")
@@ -134,7 +237,9 @@ class ScheduleAPI:
                 "date": start_dt.strftime("%Y-%m-%d"),
                 "day_of_week": start_dt.strftime("%A"),
                 "start_time": start_dt.strftime("%H:%M"),
-                "end_time": end_dt.strftime("%H:%M")
+                "end_time": end_dt.strftime("%H:%M"),
+                "starts_at": start_dt,
+                "ends_at": end_dt
             })
 
         return parsed
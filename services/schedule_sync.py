@@ -1,35 +1,117 @@
-from datetime import datetime, timedelta, date
+from datetime import datetime, time as dt_time, timedelta
 import aiohttp
 from sqlalchemy import select
 
-from database.crud import get_university_group_by_id
+from database.crud import get_university_group_by_id, mark_university_group_synced
 from database.database import AsyncSessionLocal
 from database.schedule_crud import (
-    create_schedule_class,
-    clear_group_schedule,
-    delete_old_schedule,
-    create_subject_for_group, get_subject_by_name, get_subjects_for_group, delete_subject_by_id
+    ClassRow,
+    create_subject_for_group, get_subjects_for_group, delete_subject_by_id,
+    get_group_class_rows_between, lock_group_schedule, replace_group_schedule_window
 )
-from services.schedule_api import ScheduleAPI
+from services.schedule_api import ScheduleAPI, track_cist_usage, cist_budget
+from services.sync_journal import sync_journal
 from database.models import UniversityGroup
 import logging
 from zoneinfo import ZoneInfo
-from config.settings import TIMEZONE
+from config.settings import TIMEZONE, SCHEDULE_STALE_AFTER
+from utils.stats import stats
+from typing import Dict, List, Optional, Set, Tuple
 import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
 KYIV_TZ = ZoneInfo(TIMEZONE)
 
 MAX_RETRY_ATTEMPTS = 5
+# Запитів до CIST на одну синхронізацію групи: предмети і розклад
+REQUESTS_PER_SYNC = 2
 
 api_client = ScheduleAPI()
 
-
-async def sync_group_schedule_to_db(university_group: UniversityGroup) -> bool:
-    """Синхронізувати розклад для однієї університетської групи"""
+# Фонові оновлення розкладу за запитами користувачів: group_id -> задача (одна на групу)
+_background_refreshes: Dict[int, asyncio.Task] = {}
+# Групи, синхронізація яких зараз іде в цьому процесі (будь-який trigger)
+_syncing: Set[int] = set()
+
+
+def event_row(event: Dict) -> Dict:
+    """Значення колонок schedule_classes для пари з CIST, нормалізовані так само, як при записі"""
+    return {
+        "date": event["starts_at"].date(),
+        "day_of_week": event["day_of_week"],
+        "time_start": datetime.strptime(event["start_time"], "%H:%M").time(),
+        "time_end": datetime.strptime(event["end_time"], "%H:%M").time(),
+        "starts_at": event["starts_at"],
+        "ends_at": event["ends_at"],
+        "subject_name": event["subject"],
+        "subject_brief": event["brief"],
+        "class_type": event.get("type"),
+        "auditory": event.get("auditorium"),
+        "lector": (event.get("teacher") or "").strip(),
+    }
+
+
+def diff_schedule(old_rows: List[ClassRow], new_rows: List[Dict]) -> Tuple[int, int, int]:
+    """
+    Скільки пар зʼявилось, змінилось і зникло: пара визначається датою, часом початку і предметом,
+    зміною вважається інший час кінця, тип, аудиторія або викладач.
+    Обидва списки мають охоплювати те саме вікно starts_at.
+    """
+    old = {
+        (row.date, row.time_start, row.subject_name): (row.time_end, row.class_type, row.auditory, row.lector)
+        for row in old_rows
+    }
+    new = {
+        (row["date"], row["time_start"], row["subject_name"]): (
+            row["time_end"], row["class_type"], row["auditory"], row["lector"]
+        )
+        for row in new_rows
+    }
+    inserted = len(new.keys() - old.keys())
+    deleted = len(old.keys() - new.keys())
+    updated = sum(1 for key in new.keys() & old.keys() if new[key] != old[key])
+    return inserted, updated, deleted
+
+
+async def run_group_sync(university_group: UniversityGroup, trigger: str = "manual", attempt: int = 1) -> Dict:
+    """Синхронізувати розклад групи; повертає запис журналу sync_runs (error=None — успіх)"""
     logger.info(f"Початок синхронізації групи {university_group.name}")
-
+    run = {
+        "university_group_id": university_group.id,
+        "trigger": trigger,
+        "attempt": attempt,
+        "started_at": datetime.now(KYIV_TZ),
+        "rows_inserted": 0,
+        "rows_updated": 0,
+        "rows_deleted": 0,
+        "error": None,
+    }
+
+    _syncing.add(university_group.id)
+    with track_cist_usage() as usage:
+        try:
+            await _sync_group_schedule(university_group, run)
+        finally:
+            _syncing.discard(university_group.id)
+            run.update(
+                finished_at=datetime.now(KYIV_TZ),
+                cist_ms=usage.seconds * 1000,
+                cist_requests=usage.requests,
+                payload_bytes=usage.payload_bytes,
+            )
+            sync_journal.record(**run)
+    return run
+
+
+async def sync_group_schedule_to_db(university_group: UniversityGroup, trigger: str = "manual", attempt: int = 1) -> bool:
+    """Синхронізувати розклад для однієї університетської групи і записати спробу в журнал sync_runs"""
+    run = await run_group_sync(university_group, trigger, attempt)
+    return run["error"] is None
+
+
+async def _sync_group_schedule(university_group: UniversityGroup, run: Dict) -> bool:
     async with AsyncSessionLocal() as db:
         try:
 
@@ -38,6 +120,7 @@ async def sync_group_schedule_to_db(university_group: UniversityGroup) -> bool:
 
             if not subjects_from_api:
                 logger.error(f"Не вдалося отримати предмети з CIST для {university_group.name}")
+                run["error"] = "NoSubjects"
                 return False
 
             subjects_from_db = await get_subjects_for_group(db, university_group.id)
@@ -64,58 +147,80 @@ async def sync_group_schedule_to_db(university_group: UniversityGroup) -> bool:
             logger.info(f"Видалено старих предметів: {len(old_subjects)}")
             logger.info(f"Додано нових предметів: {len(new_subjects)}")
 
-            today = datetime.now(KYIV_TZ)
-            start_ts = int(today.timestamp())
-            end_ts = int((today + timedelta(days=7)).timestamp())
+            # Вікно від початку сьогоднішнього дня: пари, що вже минули сьогодні, перезаписуються, а не губляться
+            window_start = datetime.combine(datetime.now(KYIV_TZ).date(), dt_time.min, tzinfo=KYIV_TZ)
+            window_end = window_start + timedelta(days=8)
 
             async with aiohttp.ClientSession() as session:
                 events_raw = await api_client.fetch_schedule_for_week(
                     session,
                     university_group.cist_group_id,
-                    start_ts,
-                    end_ts
+                    int(window_start.timestamp()),
+                    int(window_end.timestamp())
                 )
 
             if not events_raw:
                 logger.error(f"Не вдалося отримати розклад з API для {university_group.name}")
+                run["error"] = "NoSchedule"
                 return False
 
             events = await api_client.parse_schedule(events_raw)
-
-            await clear_group_schedule(db, university_group.id)
-            changes_count = 0
-
-            for event in events:
-                event_date = datetime.strptime(event["date"], "%Y-%m-%d").date()
-                event_time_start = datetime.strptime(event["start_time"], "%H:%M").time()
-                event_time_end = datetime.strptime(event["end_time"], "%H:%M").time()
-                subject = await get_subject_by_name(db, university_group.id, event["subject"])
-
-                await create_schedule_class(
-                    db=db,
-                    university_group_id=university_group.id,
-                    subject_id=subject.id,
-                    date_obj=event_date,
-                    day_of_week=event["day_of_week"],
-                    time_start=event_time_start,
-                    time_end=event_time_end,
-                    subject_name=event["subject"],
-                    subject_brief=event["brief"],
-                    class_type=event.get("type"),
-                    auditory=event.get("auditorium"),
-                    lector=event.get("teacher"),
-                )
-                changes_count += 1
-
-            await delete_old_schedule(db, university_group.id, date.today())
+            # Порівнюємо і замінюємо рівно те вікно, яке запитали в CIST
+            events = [event for event in events if window_start <= event["starts_at"] < window_end]
+            subject_ids = {subject.name: subject.id for subject in await get_subjects_for_group(db, university_group.id)}
+            new_rows = [dict(event_row(event), subject_id=subject_ids[event["subject"]]) for event in events]
+
+            await lock_group_schedule(db, university_group.id)
+            old_rows = await get_group_class_rows_between(db, university_group.id, window_start, window_end)
+            run["rows_inserted"], run["rows_updated"], run["rows_deleted"] = diff_schedule(old_rows, new_rows)
+            changes_count = await replace_group_schedule_window(
+                db, university_group.id, window_start, window_end, new_rows
+            )
+
+            await mark_university_group_synced(db, university_group.id, datetime.now(KYIV_TZ))
             logger.info(f"Синхронізація завершена. Додано {changes_count} пар.")
             return True
 
         except Exception as e:
             logger.error(f"Помилка синхронізації для {university_group.name}: {e}")
+            run["error"] = type(e).__name__
             return False
 
 
+def is_schedule_stale(last_synced_at: Optional[datetime]) -> bool:
+    if last_synced_at is None:
+        return True
+    return datetime.now(KYIV_TZ) - last_synced_at > timedelta(seconds=SCHEDULE_STALE_AFTER)
+
+
+def is_refreshing(university_group_id: int) -> bool:
+    return university_group_id in _background_refreshes
+
+
+def refresh_if_stale(university_group: UniversityGroup) -> bool:
+    """
+    Stale-while-revalidate для команд розкладу: відповідь іде з БД, а якщо розклад групи старший
+    за SCHEDULE_STALE_AFTER, у фоні запускається синхронізація. Вона замінює вікно розкладу однією
+    транзакцією (replace_group_schedule_window), тож паралельні запити бачать старий розклад до commit.
+    Не запускається, якщо група вже синхронізується: одночасно — не більше однієї синхронізації на групу.
+    """
+    group_id = university_group.id
+    if not is_schedule_stale(university_group.last_synced_at) or is_refreshing(group_id) or group_id in _syncing:
+        return False
+
+    task = asyncio.create_task(_refresh_group(university_group))
+    _background_refreshes[group_id] = task
+    task.add_done_callback(lambda _: _background_refreshes.pop(group_id, None))
+    return True
+
+
+async def _refresh_group(university_group: UniversityGroup):
+    if not await cist_budget.acquire(REQUESTS_PER_SYNC):
+        logger.info(f"Бюджет запитів до CIST вичерпано, фонове оновлення {university_group.name} відкладено")
+        return
+    await run_group_sync(university_group, trigger="stale")
+
+
 async def sync_all_groups_with_retry():
     """Синхронізувати всі університетські групи з повторними спробами"""
     async with AsyncSessionLocal() as db:
@@ -127,17 +232,28 @@ async def sync_all_groups_with_retry():
             return
 
         logger.info(f"Початок синхронізації {len(groups)} груп")
+        started_at = time.time()
+        started = time.perf_counter()
+        ok = failed = 0
 
         for group in groups:
             for attempt in range(MAX_RETRY_ATTEMPTS):
-                success = await sync_group_schedule_to_db(group)
+                success = await sync_group_schedule_to_db(group, trigger="nightly", attempt=attempt + 1)
                 if success:
+                    ok += 1
                     break
 
                 logger.warning(
                     f"Помилка синхронізації для {group.name}, спроба {attempt + 1}/{MAX_RETRY_ATTEMPTS}"
                 )
                 await asyncio.sleep(60)  # пауза перед повтором
+            else:
+                failed += 1
+
+        duration = time.perf_counter() - started
+        stats.record_sync(started_at, duration, ok, failed)
+        await sync_journal.flush()
+        logger.info(f"Синхронізацію завершено за {duration:.0f} с: успішно {ok}, з помилками {failed}")
 
 
 async def initial_sync_on_register(university_group_id: int) -> bool:
@@ -148,7 +264,7 @@ async def initial_sync_on_register(university_group_id: int) -> bool:
             logger.error(f"Група з ID {university_group_id} не знайдена")
             return False
 
-        return await sync_group_schedule_to_db(university_group)
+        return await sync_group_schedule_to_db(university_group, trigger="register")
 
 
 async def load_subjects_for_group(university_group_id: int, cist_group_id: int) -> bool:
@@ -1,28 +1,59 @@
 from zoneinfo import ZoneInfo
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
+from apscheduler.events import EVENT_JOB_SUBMITTED
+from datetime import date, datetime, time as dt_time, timedelta
 import logging
 
-from config.settings import TIMEZONE
-from services.message_sender import send_class_notification, send_daily_schedule
+from config.settings import (
+    TIMEZONE, SYNC_MODE, DAILY_SCHEDULE_TIME, DAILY_PREPARE_MINUTES, DAILY_DEADLINE_MINUTES
+)
+from services.daily_broadcast import daily_broadcast
+from services.message_sender import send_class_notification
 from services.schedule_sync import sync_all_groups_with_retry
+from services.sync_planner import run_adaptive_sync
+from services.maintenance import run_maintenance
 from database.database import AsyncSessionLocal
-from database.crud import get_all_groups
-from database.schedule_crud import get_class_at_time
+from database.link_index import link_index
+from database.schedule_crud import get_classes_starting_between
+from database.query_log import count_queries
+from utils.metrics import scheduler_job_lag
+from utils.stats import stats
+from utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 KYIV_TZ = ZoneInfo(TIMEZONE)
 scheduler = AsyncIOScheduler(timezone=KYIV_TZ)
 
+DAILY_HOUR, DAILY_MINUTE = map(int, DAILY_SCHEDULE_TIME.split(":"))
+
+
+def record_job_lag(event):
+    """Задержка между плановым и фактическим запуском задачи"""
+    if event.scheduled_run_times:
+        lag = datetime.now(KYIV_TZ) - max(event.scheduled_run_times)
+        scheduler_job_lag.set(max(lag.total_seconds(), 0), job=event.job_id)
+
+
+def instrumented(job_id, func):
+    """Задача как отдельный trace и отдельная единица работы для счётчика запросов"""
+    return traced(f"job {job_id}", root=True)(count_queries(f"job {job_id}")(func))
+
 
 def start_scheduler(bot):
     """Запустить планировщик задач"""
 
-    # 1. Отправка ежедневного расписания в 7:45
+    # 1. Ежедневное расписание: подготовка за DAILY_PREPARE_MINUTES минут, отправка в DAILY_SCHEDULE_TIME
+    prepare_at = datetime.combine(date.today(), dt_time(DAILY_HOUR, DAILY_MINUTE)) - timedelta(minutes=DAILY_PREPARE_MINUTES)
     scheduler.add_job(
-        send_daily_schedules_to_all,
-        trigger=CronTrigger(hour=7, minute=45, timezone=KYIV_TZ),
+        instrumented("daily_prepare", prepare_daily_schedules),
+        trigger=CronTrigger(hour=prepare_at.hour, minute=prepare_at.minute, timezone=KYIV_TZ),
+        id="daily_prepare",
+        replace_existing=True
+    )
+    scheduler.add_job(
+        instrumented("daily_schedule", send_daily_schedules_to_all),
+        trigger=CronTrigger(hour=DAILY_HOUR, minute=DAILY_MINUTE, timezone=KYIV_TZ),
         args=[bot],
         id="daily_schedule",
         replace_existing=True
@@ -30,26 +61,51 @@ def start_scheduler(bot):
 
     # 2. Проверка начала пар каждую минуту
     scheduler.add_job(
-        check_class_start,
+        instrumented("check_classes", check_class_start),
         trigger=CronTrigger(minute="*", timezone=KYIV_TZ),
         args=[bot],
         id="check_classes",
         replace_existing=True
     )
 
-    # 3. Синхронизация с CIST каждый день в 5:00
+    # 3. Синхронизация с CIST: по плану каждой группы (проверка каждую минуту) или всех сразу в 5:00
+    if SYNC_MODE == "adaptive":
+        scheduler.add_job(
+            instrumented("sync_cist", run_adaptive_sync),
+            trigger=CronTrigger(minute="*", second=30, timezone=KYIV_TZ),
+            id="sync_cist",
+            replace_existing=True,
+            coalesce=True
+        )
+    else:
+        scheduler.add_job(
+            instrumented("sync_cist", sync_all_groups_with_retry),
+            trigger=CronTrigger(hour=5, minute=0, timezone=KYIV_TZ),
+            id="sync_cist",
+            replace_existing=True
+        )
+
+    # 4. Обслуживание БД (партиции расписания, группы без чатов) каждый день в 4:30
     scheduler.add_job(
-        sync_all_groups_with_retry,
-        trigger=CronTrigger(hour=5, minute=0, timezone=KYIV_TZ),
-        id="sync_cist",
+        instrumented("db_maintenance", run_maintenance),
+        trigger=CronTrigger(hour=4, minute=30, timezone=KYIV_TZ),
+        id="db_maintenance",
         replace_existing=True
     )
 
+    scheduler.add_listener(record_job_lag, EVENT_JOB_SUBMITTED)
     scheduler.start()
     logger.info("Планировщик запущен")
-    logger.info("Ежедневное расписание: каждый день в 7:45 (Киев)")
+    logger.info(
+        f"Ежедневное расписание: подготовка в {prepare_at.strftime('%H:%M')}, отправка в {DAILY_SCHEDULE_TIME}, "
+        f"дедлайн через {DAILY_DEADLINE_MINUTES} мин (Киев)"
+    )
     logger.info("Проверка начала пар: каждую минуту (Киев)")
-    logger.info("Синхронизация с CIST: каждый день в 5:00 (Киев)")
+    if SYNC_MODE == "adaptive":
+        logger.info("Синхронизация с CIST: адаптивная, по плану каждой группы")
+    else:
+        logger.info("Синхронизация с CIST: каждый день в 5:00 (Киев)")
+    logger.info("Обслуживание БД: каждый день в 4:30 (Киев)")
 
 
 def stop_scheduler():
@@ -58,43 +114,44 @@ def stop_scheduler():
     logger.info("Планировщик остановлен")
 
 
+async def prepare_daily_schedules():
+    """Заранее подготовить тексты ежедневной рассылки"""
+    await daily_broadcast.prepare(datetime.now(KYIV_TZ).date())
+
+
 async def send_daily_schedules_to_all(bot):
-    """Отправить ежедневное расписание во все группы"""
+    """Отправить ежедневное расписание во все группы, равномерно до дедлайна"""
     logger.info("Отправка ежедневного расписания во все группы")
 
-    db = AsyncSessionLocal()
-    try:
-        groups = await get_all_groups(db)
-        print(groups)
-        # Используем киевское время
-        today = datetime.now(KYIV_TZ).date()
-
-        for group in groups:
-            try:
-                await send_daily_schedule(bot, group, today)
-            except Exception as e:
-                logger.error(f"Ошибка отправки расписания в группу {group.university_group.name}: {e}")
-    finally:
-        await db.close()
+    # Используем киевское время
+    today = datetime.now(KYIV_TZ).date()
+    # Дедлайн считается от планового времени, а не от фактического запуска
+    deadline = datetime.combine(today, dt_time(DAILY_HOUR, DAILY_MINUTE), tzinfo=KYIV_TZ) \
+        + timedelta(minutes=DAILY_DEADLINE_MINUTES)
+    await daily_broadcast.dispatch(bot, today, deadline)
 
 
 async def check_class_start(bot):
     """Проверить, не начинается ли сейчас пара (каждую минуту)"""
     # Используем киевское время
-    now = datetime.now(KYIV_TZ)
-    current_time = now.time().replace(second=0, microsecond=0)
-    today = now.date()
+    minute_start = datetime.now(KYIV_TZ).replace(second=0, microsecond=0)
 
     db = AsyncSessionLocal()
     try:
-        groups = await get_all_groups(db)
-        for group in groups:
-            schedule_class = await get_class_at_time(db, group.university_group_id, today, current_time)
-            if schedule_class:
-                logger.info(f"Начало пары: {schedule_class.subject_name} ({group.university_group.name})")
-                try:
-                    await send_class_notification(bot, group, schedule_class)
-                except Exception as e:
-                    logger.error(f"Ошибка отправки уведомления: {e}")
+        starting = await get_classes_starting_between(db, minute_start, minute_start + timedelta(minutes=1))
+        if starting:
+            try:
+                await link_index.refresh_if_changed(db)
+            except Exception as e:
+                logger.warning(f"Не удалось проверить актуальность индекса ссылок: {e}")
     finally:
         await db.close()
+
+    for sent, (group, schedule_class) in enumerate(starting):
+        stats.set_backlog("class_start", len(starting) - sent)
+        logger.info(f"Начало пары: {schedule_class.subject_name} ({group.group_name})")
+        try:
+            await send_class_notification(bot, group, schedule_class)
+        except Exception as e:
+            logger.error(f"Ошибка отправки уведомления: {e}")
+    stats.set_backlog("class_start", 0)
@@ -0,0 +1,65 @@
+"""
+Буфер журналу синхронізацій (таблиця sync_runs).
+
+Синхронізація лише додає запис у список у памʼяті; в БД записи йдуть пачкою одним
+executemany — щойно набереться batch_size записів або через flush_interval секунд після
+першого незбереженого (write-behind, як у FSM сховищі). Наприкінці нічної синхронізації
+і при зупинці бота буфер скидається примусово.
+"""
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+
+from config.settings import SYNC_JOURNAL_BATCH_SIZE, SYNC_JOURNAL_FLUSH_INTERVAL
+from database.database import AsyncSessionLocal
+from database.sync_crud import save_sync_runs
+
+logger = logging.getLogger(__name__)
+
+# Не тримати в памʼяті більше, якщо БД недоступна довго
+MAX_PENDING = 5000
+
+
+class SyncJournal:
+    def __init__(self, batch_size: int = SYNC_JOURNAL_BATCH_SIZE, flush_interval: float = SYNC_JOURNAL_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def record(self, **run):
+        self.pending.append(run)
+        if len(self.pending) >= self.batch_size:
+            self._schedule(0)
+        elif self._flush_task is None or self._flush_task.done():
+            self._schedule(self.flush_interval)
+
+    def _schedule(self, delay: float):
+        if self._flush_task is not None and not self._flush_task.done() and delay:
+            return
+        self._flush_task = asyncio.create_task(self._delayed_flush(delay))
+
+    async def _delayed_flush(self, delay: float):
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            runs, self.pending = self.pending, []
+            if not runs:
+                return
+            try:
+                async with AsyncSessionLocal() as db:
+                    await save_sync_runs(db, runs)
+            except Exception as e:
+                logger.error(f"Не вдалося записати журнал синхронізацій ({len(runs)} записів): {e}")
+                self.pending = (runs + self.pending)[-MAX_PENDING:]
+
+    async def close(self):
+        await self.flush()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+
+sync_journal = SyncJournal()
@@ -0,0 +1,128 @@
+"""
+Адаптивна синхронізація розкладу з CIST (SYNC_MODE=adaptive).
+
+Кожна група має власний час наступної синхронізації (university_groups.next_sync_at) та інтервал.
+Задача планувальника щохвилини бере (claim_due_groups) групи, час яких настав, — кожну бере лише
+одна репліка — і синхронізує їх, поки дозволяє бюджет запитів до CIST (services/schedule_api.cist_budget,
+спільний для реплік при RATE_LIMIT_BACKEND=postgres); решта повертається в чергу до наступної хвилини.
+
+Після синхронізації інтервал перераховується:
+- розклад змінився — інтервал удвічі коротший (не менше SYNC_MIN_INTERVAL);
+- не змінився — у півтора раза довший (не більше SYNC_MAX_INTERVAL);
+- є пари в найближчі SYNC_UPCOMING_HOURS годин — не довший за SYNC_UPCOMING_INTERVAL;
+- помилка — експоненційна затримка від SYNC_MIN_INTERVAL, інтервал групи не змінюється.
+До кожного інтервалу додається ±10% випадкового зсуву, а групам без плану перший запуск
+призначається рівномірно протягом SYNC_DEFAULT_INTERVAL, тож навантаження розподілене в часі.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import logging
+import random
+import time
+
+from config.settings import (
+    SYNC_MIN_INTERVAL, SYNC_DEFAULT_INTERVAL, SYNC_MAX_INTERVAL, SYNC_UPCOMING_HOURS, SYNC_UPCOMING_INTERVAL
+)
+from database.database import AsyncSessionLocal
+from database.models import KYIV_TZ
+from database.sync_crud import (
+    plan_unscheduled_groups, claim_due_groups, release_groups, get_groups_with_classes_between, save_group_sync_plans
+)
+from services.schedule_api import cist_budget
+from services.schedule_sync import REQUESTS_PER_SYNC, run_group_sync, is_refreshing
+from services.sync_journal import sync_journal
+from utils.stats import stats
+
+logger = logging.getLogger(__name__)
+
+# Більше груп за одну хвилину не беремо навіть при повному бюджеті
+MAX_GROUPS_PER_TICK = 50
+# Через цей час взята, але не дооброблена (збій репліки) група знову стає доступною
+CLAIM_LEASE = timedelta(minutes=15)
+JITTER = 0.1
+
+
+def next_interval(current: Optional[int], changed: bool, has_upcoming_classes: bool) -> int:
+    interval = current or SYNC_DEFAULT_INTERVAL
+    interval = interval / 2 if changed else interval * 1.5
+    if has_upcoming_classes:
+        interval = min(interval, SYNC_UPCOMING_INTERVAL)
+    return int(min(max(interval, SYNC_MIN_INTERVAL), SYNC_MAX_INTERVAL))
+
+
+def failure_delay(failures: int) -> int:
+    return int(min(SYNC_MIN_INTERVAL * 2 ** (failures - 1), SYNC_MAX_INTERVAL))
+
+
+def with_jitter(now: datetime, seconds: float) -> datetime:
+    return now + timedelta(seconds=seconds * random.uniform(1 - JITTER, 1 + JITTER))
+
+
+def plan_after_run(group, run: Dict, has_upcoming_classes: bool, now: datetime) -> Dict:
+    """Новий план групи за результатом синхронізації"""
+    if run["error"] is not None:
+        failures = group.sync_failures + 1
+        return {
+            "id": group.id,
+            "next_sync_at": with_jitter(now, failure_delay(failures)),
+            "sync_interval": group.sync_interval,
+            "sync_failures": failures,
+        }
+    changed = bool(run["rows_inserted"] or run["rows_updated"] or run["rows_deleted"])
+    interval = next_interval(group.sync_interval, changed, has_upcoming_classes)
+    return {
+        "id": group.id,
+        "next_sync_at": with_jitter(now, interval),
+        "sync_interval": interval,
+        "sync_failures": 0,
+    }
+
+
+async def run_adaptive_sync():
+    """Синхронізувати групи, час яких настав, у межах бюджету запитів до CIST"""
+    now = datetime.now(KYIV_TZ)
+    async with AsyncSessionLocal() as db:
+        planned = await plan_unscheduled_groups(db, now, SYNC_DEFAULT_INTERVAL)
+        due = await claim_due_groups(db, now, CLAIM_LEASE, MAX_GROUPS_PER_TICK)
+        upcoming = await get_groups_with_classes_between(
+            db, [group.id for group in due], now, now + timedelta(hours=SYNC_UPCOMING_HOURS)
+        ) if due else set()
+    if planned:
+        logger.info(f"Заплановано першу синхронізацію для {planned} груп")
+    if not due:
+        return
+
+    started_at = time.time()
+    started = time.perf_counter()
+    plans = []
+    released = []
+    ok = failed = 0
+    for index, group in enumerate(due):
+        if is_refreshing(group.id):
+            # Вже оновлюється у фоні за запитом користувача; візьмемо наступного разу
+            released.append(group.id)
+            continue
+        if not await cist_budget.acquire(REQUESTS_PER_SYNC):
+            released.extend(waiting.id for waiting in due[index:])
+            logger.info(f"Бюджет запитів до CIST вичерпано, {len(due) - index} груп чекають наступного запуску")
+            break
+        run = await run_group_sync(group, trigger="adaptive", attempt=group.sync_failures + 1)
+        if run["error"] is None:
+            ok += 1
+        else:
+            failed += 1
+        plan = plan_after_run(group, run, group.id in upcoming, datetime.now(KYIV_TZ))
+        plans.append(plan)
+        logger.info(
+            f"Група {group.name}: наступна синхронізація {plan['next_sync_at'].strftime('%d.%m %H:%M')}"
+            f" (інтервал {plan['sync_interval']} с, помилок поспіль {plan['sync_failures']})"
+        )
+
+    async with AsyncSessionLocal() as db:
+        if plans:
+            await save_group_sync_plans(db, plans)
+        if released:
+            await release_groups(db, released, now)
+    if plans:
+        stats.record_sync(started_at, time.perf_counter() - started, ok, failed)
+    await sync_journal.flush()
@@ -0,0 +1,168 @@
+"""
+Налаштування логування бота.
+
+Записи з event loop лише кладуться в чергу (QueueHandler), а форматування і запис у stdout
+та файл виконує окремий потік QueueListener, тож логування не блокує loop дисковим I/O.
+Файл ротується і за розміром (LOG_MAX_BYTES), і за часом (LOG_ROTATE_WHEN), формат — текст
+або JSON Lines (LOG_FORMAT). Для гарячих логерів (LOG_RATE_LIMITS) INFO/DEBUG обмежуються
+кількістю записів на секунду; WARNING і вище проходять завжди.
+"""
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import Dict, Optional, Tuple
+import json
+import logging
+import os
+import queue
+import sys
+import time
+
+from config.settings import (
+    LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_MAX_BYTES, LOG_ROTATE_WHEN, LOG_BACKUP_COUNT, LOG_RATE_LIMITS
+)
+from utils.tracing import TraceContextFilter
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s] %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Один JSON обʼєкт на рядок"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "trace_id": getattr(record, "trace_id", "-"),
+            "span_id": getattr(record, "span_id", "-"),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """Ротація за часом, а також щойно файл перевищить max_bytes"""
+
+    def __init__(self, filename: str, when: str, backup_count: int, max_bytes: int):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        self.stream.seek(0, 2)
+        return self.stream.tell() + len(self.format(record).encode("utf-8")) + 1 >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Кілька ротацій за розміром в одному інтервалі не мають перезаписувати одна одну
+        name = super().rotation_filename(default_name)
+        number = 0
+        candidate = name
+        while os.path.exists(candidate):
+            number += 1
+            candidate = f"{name}.{number:03d}"
+        return candidate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket на логер для записів нижче WARNING.
+    Кількість пропущених записів дописується до першого запису, що пройде після паузи.
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__()
+        # Найдовші префікси перевіряємо першими
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self.buckets: Dict[str, Tuple[float, float]] = {}
+        self.suppressed: Dict[str, int] = {}
+
+    def rate_for(self, name: str) -> Optional[float]:
+        for prefix, rate in self.limits:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.limits:
+            return True
+        rate = self.rate_for(record.name)
+        if rate is None:
+            return True
+
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(record.name, (rate, now))
+        tokens = min(rate, tokens + (now - updated_at) * rate)
+        if tokens < 1:
+            self.buckets[record.name] = (tokens, now)
+            self.suppressed[record.name] = self.suppressed.get(record.name, 0) + 1
+            return False
+
+        self.buckets[record.name] = (tokens - 1, now)
+        skipped = self.suppressed.pop(record.name, 0)
+        if skipped:
+            record.msg = f"{record.getMessage()} [пропущено {skipped} записів цього логера]"
+            record.args = None
+        return True
+
+
+class LoopSafeQueueHandler(QueueHandler):
+    """
+    Готує запис у потоці, що логує (підставляє аргументи, форматує traceback),
+    щоб потік-слухач не торкався обʼєктів event loop; traceback лишається в exc_text.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+def parse_rate_limits(value: str) -> Dict[str, float]:
+    """Рядок виду services.scheduler=10,services.message_sender=20 -> {логер: записів/с}"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, rate = item.partition("=")
+        limits[name.strip()] = float(rate)
+    return limits
+
+
+def setup_logging() -> QueueListener:
+    """Налаштувати кореневий логер; повертає запущений QueueListener (зупинити при завершенні)"""
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(SizedTimedRotatingFileHandler(LOG_FILE, LOG_ROTATE_WHEN, LOG_BACKUP_COUNT, LOG_MAX_BYTES))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LoopSafeQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(parse_rate_limits(LOG_RATE_LIMITS)))
+    # trace_id береться з contextvars, тому фільтр має працювати в потоці, що логує
+    queue_handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
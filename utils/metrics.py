@@ -0,0 +1,224 @@
+"""
+Метрики у форматі Prometheus без зовнішніх залежностей.
+Значення віддає services/metrics_server.py за адресою /metrics.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import functools
+import math
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple, float] = {}
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Значення рахується під час збору метрик (лише для метрик без міток)"""
+        self.function = function
+
+    def samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.values.items()
+        ]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [лічильники по бакетах..., +Inf], сума
+        self.counts: Dict[Tuple, List[int]] = {}
+        self.sums: Dict[Tuple, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        counts[bisect_left(self.buckets, value)] += 1
+        self.sums[key] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self.sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+registry = Registry()
+
+handler_duration = registry.register(Histogram(
+    "bot_handler_duration_seconds", "Час обробки апдейту хендлером", ["handler"]
+))
+db_duration = registry.register(Histogram(
+    "db_crud_duration_seconds", "Час виконання CRUD функцій database/*", ["function"]
+))
+cist_duration = registry.register(Histogram(
+    "cist_request_duration_seconds", "Час запитів до CIST API", ["endpoint"]
+))
+telegram_duration = registry.register(Histogram(
+    "telegram_request_duration_seconds", "Час запитів до Telegram Bot API", ["method"]
+))
+telegram_errors = registry.register(Counter(
+    "telegram_request_errors_total", "Помилки запитів до Telegram Bot API", ["method", "error"]
+))
+notifications = registry.register(Counter(
+    "notifications_total", "Надіслані та невдалі сповіщення", ["kind", "status"]
+))
+db_pool_checked_out = registry.register(Gauge(
+    "db_pool_checked_out", "Кількість зайнятих зʼєднань пулу БД"
+))
+db_pool_overflow = registry.register(Gauge(
+    "db_pool_overflow", "Кількість зʼєднань понад pool_size"
+))
+scheduler_job_lag = registry.register(Gauge(
+    "scheduler_job_lag_seconds", "Затримка запуску задачі планувальника відносно запланованого часу", ["job"]
+))
+
+event_loop_lag = registry.register(Gauge(
+    "event_loop_lag_seconds", "Затримка пробудження задачі watchdog відносно запланованого часу"
+))
+event_loop_blocked = registry.register(Counter(
+    "event_loop_blocked_total", "Скільки разів event loop був заблокований довше за поріг"
+))
+
+daily_broadcast_margin = registry.register(Gauge(
+    "daily_broadcast_deadline_margin_seconds",
+    "Запас до дедлайну щоденної розсилки в останньому запуску (відʼємний — запізнення)"
+))
+
+chats_reaped = registry.register(Counter(
+    "chats_reaped_total", "Видалені недоступні чати й підписки та перенесені на супергрупу чати", ["kind"]
+))
+outbound_queue_depth = registry.register(Gauge(
+    "outbound_queue_depth", "Відправки, що чекають дозволу ліміту Bot API, за смугою пріоритету", ["lane"]
+))
+outbound_queue_wait = registry.register(Histogram(
+    "outbound_queue_wait_seconds", "Час очікування відправки в черзі смуги пріоритету", ["lane"]
+))
+
+
+def timed(histogram: Histogram, **labels):
+    """Декоратор для async функцій: записати час виконання в histogram"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+def track_db(func):
+    """Декоратор для CRUD функцій: метрика db_crud_duration_seconds з міткою function"""
+    return timed(db_duration, function=func.__name__)(func)
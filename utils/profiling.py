@@ -0,0 +1,160 @@
+"""
+Профілювання процесу бота на льоту (команда /profile).
+
+sample — таймер процесорного часу (SIGPROF) кожні interval секунд знімає стек коду, що саме
+виконується в потоці event loop; результат — топ функцій і collapsed stacks («a;b;c 42»),
+які читають flamegraph.pl, speedscope, inferno. Семпли йдуть лише коли процес працює, тож
+простій у select не розмиває картину. Якщо loop не в головному потоці (сигнали недоступні),
+стек знімає окремий потік — такі семпли зміщені до точок, де loop віддає GIL.
+cpu — cProfile у потоці loop на заданий час (увесь код бота виконується в цьому потоці).
+mem — два знімки tracemalloc з інтервалом і різниця між ними за рядками коду.
+"""
+from collections import Counter
+from typing import Optional, Tuple
+import asyncio
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Одночасно лише одна сесія: профілі не мають накладатися
+profiling_lock = asyncio.Lock()
+
+
+def frame_name(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.f_code.co_name}"
+
+
+def collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_thread(thread_id: int, duration: float, interval: float) -> Counter:
+    """Знімати стек потоку thread_id протягом duration секунд (виконується в окремому потоці)"""
+    stacks: Counter = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[collapse(frame)] += 1
+        time.sleep(interval)
+    return stacks
+
+
+async def sample_signal(duration: float, interval: float) -> Counter:
+    """Семпли за SIGPROF; обробник сигналу виконується в головному потоці між байткодами"""
+    stacks: Counter = Counter()
+
+    def on_sample(signum, frame):
+        if frame is not None:
+            stacks[collapse(frame)] += 1
+
+    previous = signal.signal(signal.SIGPROF, on_sample)
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+    return stacks
+
+
+async def sample_loop(duration: float, interval: float = 0.005) -> Counter:
+    if hasattr(signal, "SIGPROF") and threading.current_thread() is threading.main_thread():
+        return await sample_signal(duration, interval)
+    loop_thread_id = threading.get_ident()
+    return await asyncio.get_running_loop().run_in_executor(
+        None, sample_thread, loop_thread_id, duration, interval
+    )
+
+
+def collapsed_stacks(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def top_functions(stacks: Counter, limit: int = 20) -> str:
+    """Топ функцій за власними (верхівка стеку) і загальними семплами"""
+    total = sum(stacks.values()) or 1
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for name in set(frames):
+            inclusive[name] += count
+
+    lines = [f"Семплів: {total}", "", "Власний час:"]
+    lines += [f"{count / total * 100:5.1f}%  {name}" for name, count in own.most_common(limit)]
+    lines += ["", "Разом з викликаними:"]
+    lines += [f"{count / total * 100:5.1f}%  {name}" for name, count in inclusive.most_common(limit)]
+    return "\n".join(lines)
+
+
+async def cprofile_loop(duration: float, limit: int = 20) -> Tuple[str, bytes]:
+    """cProfile всього, що виконується в event loop за duration секунд: (топ за cumulative, .prof)"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(duration)
+    finally:
+        profiler.disable()
+
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    # Формат dump_stats, з повними шляхами (до strip_dirs) — відкривається pstats і snakeviz
+    raw = marshal.dumps(stats.stats)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return output.getvalue(), raw
+
+
+async def tracemalloc_diff(duration: float, limit: int = 20, frames: int = 10) -> str:
+    """Приріст памʼяті за duration секунд за рядками коду"""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot()
+        await asyncio.sleep(duration)
+        after = tracemalloc.take_snapshot()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen *>")]
+    stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+    total_diff = sum(stat.size_diff for stat in stats)
+    lines = [f"Зміна за {duration:.0f} с: {total_diff / 1024:+.1f} КБ", ""]
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        filename = frame.filename
+        if filename.startswith(PROJECT_ROOT):
+            filename = os.path.relpath(filename, PROJECT_ROOT)
+        lines.append(
+            f"{stat.size_diff / 1024:+9.1f} КБ {stat.count_diff:+7d} обʼєктів  {filename}:{frame.lineno}"
+        )
+    return "\n".join(lines)
+
+
+def parse_duration(value: Optional[str], default: float, maximum: float) -> float:
+    try:
+        duration = float(value) if value else default
+    except ValueError:
+        duration = default
+    return min(max(duration, 1.0), maximum)
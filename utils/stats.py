@@ -0,0 +1,103 @@
+"""
+Оперативна статистика процесу для команди /stats.
+
+Лічильники — кільцеві буфери похвилинних кошиків за останню годину, затримки — кільцевий
+буфер останніх вимірів. Запис — кілька операцій над списком у тому ж місці, де оновлюються
+метрики Prometheus (utils/metrics.py), а /stats лише читає готові значення.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import math
+import time
+
+
+class RateCounter:
+    """Кількість подій за останні minutes хвилин, кошиками по хвилині"""
+
+    def __init__(self, minutes: int = 60):
+        self.minutes = minutes
+        self.counts: List[int] = [0] * minutes
+        self.stamps: List[int] = [-1] * minutes
+
+    def add(self, amount: int = 1):
+        minute = int(time.time() // 60)
+        slot = minute % self.minutes
+        if self.stamps[slot] != minute:
+            self.stamps[slot] = minute
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+
+    def total(self, minutes: Optional[int] = None) -> int:
+        """Сума за останні minutes повних хвилин разом з поточною"""
+        minutes = min(minutes or self.minutes, self.minutes)
+        oldest = int(time.time() // 60) - minutes
+        return sum(count for count, stamp in zip(self.counts, self.stamps) if stamp > oldest)
+
+
+class LatencyWindow:
+    """Останні maxlen вимірів (час, значення) для перцентилів"""
+
+    def __init__(self, maxlen: int = 2048):
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=maxlen)
+
+    def add(self, value: float):
+        self.samples.append((time.monotonic(), value))
+
+    def percentile(self, fraction: float, seconds: float = 300) -> Optional[float]:
+        oldest = time.monotonic() - seconds
+        values = sorted(value for at, value in self.samples if at >= oldest)
+        if not values:
+            return None
+        return values[min(len(values) - 1, math.ceil(fraction * len(values)) - 1)]
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = RateCounter()
+        self.misses = RateCounter()
+
+    def hit(self):
+        self.hits.add()
+
+    def miss(self):
+        self.misses.add()
+
+    def hit_rate(self, minutes: Optional[int] = None) -> Optional[float]:
+        hits, misses = self.hits.total(minutes), self.misses.total(minutes)
+        return hits / (hits + misses) if hits + misses else None
+
+
+class SyncSummary:
+    __slots__ = ("started_at", "duration", "ok", "failed")
+
+    def __init__(self, started_at: float, duration: float, ok: int, failed: int):
+        self.started_at = started_at
+        self.duration = duration
+        self.ok = ok
+        self.failed = failed
+
+
+class RuntimeStats:
+    def __init__(self):
+        self.updates = RateCounter()
+        self.handler_latency = LatencyWindow()
+        self.messages_sent = RateCounter()
+        self.messages_failed = RateCounter()
+        self.caches: Dict[str, CacheStats] = {}
+        # Скільки повідомлень розсилки ще не відправлено, за видом розсилки
+        self.backlog: Dict[str, int] = {}
+        self.last_sync: Optional[SyncSummary] = None
+
+    def cache(self, name: str) -> CacheStats:
+        if name not in self.caches:
+            self.caches[name] = CacheStats()
+        return self.caches[name]
+
+    def set_backlog(self, kind: str, remaining: int):
+        self.backlog[kind] = max(remaining, 0)
+
+    def record_sync(self, started_at: float, duration: float, ok: int, failed: int):
+        self.last_sync = SyncSummary(started_at, duration, ok, failed)
+
+
+stats = RuntimeStats()
@@ -0,0 +1,239 @@
+"""
+Легке трасування у моделі OpenTelemetry: trace_id/span_id, батьківські спани, атрибути, статус.
+
+Кореневий спан створюється на кожен апдейт (bot/middlewares/tracing.py) і кожну задачу планувальника,
+дочірні — для SQL запитів, запитів до CIST і Bot API. Дочірні спани без кореневого не створюються.
+Експорт: TRACING=console — рядок у лог на кожен спан, TRACING=file — JSON Lines у TRACE_FILE
+з полями як у OTLP JSON (traceId, spanId, parentSpanId, startTimeUnixNano, ...).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+import functools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config.settings import TRACING, TRACE_FILE
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException):
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1_000_000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+
+class ConsoleExporter:
+    def export(self, span: Span):
+        status = f" ERROR {span.error}" if span.error else ""
+        logger.info(f"span {span.name} {span.duration_ms:.1f} мс "
+                    f"trace={span.trace_id} span={span.span_id} parent={span.parent_span_id or '-'}{status}")
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileExporter:
+    """
+    JSON Lines; спани буферизуються і після завершення кореневого спана передаються окремому потоку,
+    який пише їх у файл, тож файловий I/O не блокує event loop (як QueueListener у utils/logger.py)
+    """
+
+    def __init__(self, path: str, max_buffer: int = 1000):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.buffer: List[str] = []
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def export(self, span: Span):
+        self.buffer.append(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+        if span.parent_span_id is None or len(self.buffer) >= self.max_buffer:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+            self._thread.start()
+        self.queue.put(lines)
+
+    def _write_loop(self):
+        stopping = False
+        while not stopping:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            # Усе, що накопичилось за час запису, дописуємо одним відкриттям файлу
+            while not self.queue.empty():
+                more = self.queue.get()
+                if more is None:
+                    stopping = True
+                    break
+                batch.extend(more)
+            try:
+                with open(self.path, "a", encoding="utf-8") as file:
+                    file.write("\n".join(batch) + "\n")
+            except OSError as e:
+                logger.error(f"Не вдалося записати спани в {self.path}: {e}")
+
+    def close(self):
+        """Передати залишок буфера потоку і дочекатися запису"""
+        self.flush()
+        if self._thread is not None:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+class Tracer:
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, root: bool = False, **attributes) -> Optional[Span]:
+        """Новий спан без встановлення його поточним; None, якщо трасування вимкнено або немає батька"""
+        if self.exporter is None:
+            return None
+        parent = _current_span.get()
+        if parent is None:
+            if not root:
+                return None
+            return Span(name, f"{random.getrandbits(128):032x}", None, attributes)
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+
+    def end_span(self, span: Span):
+        span.end_ns = time.time_ns()
+        self.exporter.export(span)
+
+    @contextmanager
+    def span(self, name: str, root: bool = False, **attributes):
+        """Спан на час блоку; всередині блоку він поточний для дочірніх спанів і логів"""
+        span = self.start_span(name, root=root, **attributes)
+        if span is None:
+            yield None
+            return
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+def build_exporter():
+    if TRACING == "console":
+        return ConsoleExporter()
+    if TRACING == "file":
+        return FileExporter(TRACE_FILE)
+    return None
+
+
+tracer = Tracer(build_exporter())
+
+
+def traced(name: str, root: bool = False):
+    """Декоратор для async функцій: спан на кожен виклик (root=True — новий trace для задач планувальника)"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(name, root=root):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_engine(engine: Engine):
+    """Дочірній спан на кожен SQL запит"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span("db.query", **{"db.system": "postgresql", "db.statement": statement[:1000]})
+        conn.info.setdefault("trace_spans", []).append(span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = conn.info["trace_spans"].pop()
+        if span is not None:
+            tracer.end_span(span)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        spans = conn.info.get("trace_spans") if conn is not None else None
+        if spans:
+            span = spans.pop()
+            if span is not None:
+                span.record_exception(exception_context.original_exception)
+                tracer.end_span(span)
+
+
+class TraceContextFilter(logging.Filter):
+    """Додає trace_id і span_id поточного спана в кожен запис логу"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = _current_span.get()
+        record.trace_id = span.trace_id if span else "-"
+        record.span_id = span.span_id if span else "-"
+        return True
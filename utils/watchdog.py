@@ -0,0 +1,96 @@
+"""
+Watchdog event loop.
+
+Задача в loop кожні interval секунд засинає і міряє, наскільки пізніше прокинулась (лаг),
+та оновлює heartbeat. Окремий потік перевіряє heartbeat: якщо loop не відповідає довше
+за threshold, він знімає стек потоку loop (sys._current_frames) — це і є код, що блокує.
+Вмикається й вимикається під час роботи (команда /watchdog).
+"""
+from collections import deque
+from typing import Deque, Optional, Tuple
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from config.settings import LOOP_WATCHDOG_INTERVAL, LOOP_LAG_THRESHOLD
+from utils.metrics import event_loop_lag, event_loop_blocked
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+    def __init__(self, interval: float = LOOP_WATCHDOG_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.blocked_count = 0
+        # (час, тривалість на момент знімку, стек) останніх блокувань
+        self.stacks: Deque[Tuple[float, float, str]] = deque(maxlen=5)
+
+        self._heartbeat = time.monotonic()
+        self._reported = False
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop: Optional[threading.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Запустити з потоку event loop"""
+        if self.enabled:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._reported = False
+        # Свій Event на кожен запуск, щоб потік після швидкого off/on не лишився жити
+        self._stop = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        threading.Thread(target=self._monitor, args=(self._stop,), name="loop-watchdog", daemon=True).start()
+        logger.info(f"Watchdog event loop увімкнено (поріг {self.threshold * 1000:.0f} мс)")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self._task.cancel()
+        self._task = None
+        self._stop.set()
+        event_loop_lag.set(0)
+        logger.info("Watchdog event loop вимкнено")
+
+    async def _measure(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - started - self.interval, 0.0)
+            self._heartbeat = time.monotonic()
+            self._reported = False
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            event_loop_lag.set(lag)
+            if lag >= self.threshold:
+                logger.warning(f"Event loop був заблокований {lag * 1000:.0f} мс")
+
+    def _monitor(self, stop: threading.Event):
+        while not stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled < self.threshold or self._reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._reported = True
+            stack = "".join(traceback.format_stack(frame))
+            self.blocked_count += 1
+            self.stacks.append((time.time(), stalled, stack))
+            event_loop_blocked.inc()
+            logger.warning(f"Event loop не відповідає {stalled * 1000:.0f} мс, стек потоку loop:\n{stack}")
+
+
+watchdog = LoopWatchdog()